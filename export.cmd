@@ -10,6 +10,7 @@ Set "export-dir=%1"
 Set "work-dir=%~dp0"
 :: Top-level files & dirs
 Set "main=%work-dir%\main.py"
+Set "service=%work-dir%\service.py"
 Set "addon=%work-dir%\addon.xml"
 Set "lic=%work-dir%\LICENSE"
 Set "resources=%work-dir%\resources"
@@ -23,6 +24,7 @@ mkdir %archive%
 :: Copy files to tmp dir
 echo Copying files to tmp dir: %archive%...
 COPY %main% "%archive%\"
+COPY %service% "%archive%\"
 COPY %addon% "%archive%\"
 COPY %lic% "%archive%\"
 XCOPY /e /y /q %resources% "%archive%\resources\"
@@ -27,6 +27,7 @@ mkdir "$PLUGIN"
 # copy & zip files
 echo "Copying files..."
 cp ./main.py "$PLUGIN"
+cp ./service.py "$PLUGIN"
 cp ./addon.xml "$PLUGIN"
 cp ./LICENSE "$PLUGIN"
 cp -r ./resources "$PLUGIN"
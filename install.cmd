@@ -7,12 +7,14 @@ Set "kodi-dir=%APPDATA%\Kodi\addons\plugin.matchday\"
 Set "work-dir=%~dp0"
 :: Top-level files & dirs
 Set "main=%work-dir%\main.py"
+Set "service=%work-dir%\service.py"
 Set "addon=%work-dir%\addon.xml"
 Set "resources=%work-dir%\resources"
 
 echo Copying data from %main% to %kodi-dir%...
 echo Installing addon...
 COPY %main% %kodi-dir%
+COPY %service% %kodi-dir%
 COPY %addon% %kodi-dir%
 echo Installing resources...
 XCOPY /y /s /q %resources% "%kodi-dir%resources\"
@@ -28,14 +28,8 @@
 #  You should have received a copy of the GNU General Public License
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-import xbmcaddon
-
-from resources.lib import kodilogging
 from resources.lib import kodirouting
 
 # Keep this file to a minimum, as Kodi
 # doesn't keep a compiled copy of this
-ADDON = xbmcaddon.Addon()
-kodilogging.config()
-
 kodirouting.run()
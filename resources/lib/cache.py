@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of remote server responses.
+"""
+
+#  Copyright (c) 2024
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import xbmc
+
+from resources.lib.kodiutils import get_profile_path
+
+CACHE_DIR = 'cache'
+# Characters read at a time when streaming a cached body
+CHUNK_SIZE = 16 * 1024
+# Max. seconds to wait for another process to fetch a resource
+LOCK_TIMEOUT = 20
+# Seconds after which a lock is assumed to be left by a process that died
+STALE_LOCK = 60
+# Seconds between checks of a lock held by another process
+LOCK_POLL_INTERVAL = 0.05
+# Max. bytes of cached responses kept on disk
+MAX_CACHE_SIZE = 20 * 1024 * 1024
+# Seconds after which a temp file is assumed to be left by a failed write
+STALE_TMP = 60 * 60
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    """
+    A single cached response: the body, plus the validators the server sent
+    with it. The body is read from disk when first used.
+    """
+
+    def __init__(self, url, body=None, etag=None, last_modified=None, stored=None,
+                 body_path=None):
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored = stored if stored is not None else time.time()
+        self.body_path = body_path
+        self.__body = body
+
+    @property
+    def body(self):
+        if self.__body is None:
+            with open(self.body_path, 'r', encoding='utf-8') as body_file:
+                self.__body = body_file.read()
+        return self.__body
+
+    def iter_body(self, chunk_size=CHUNK_SIZE):
+        """
+        Read the body in chunks, without holding all of it in memory
+        :param chunk_size: The number of characters per chunk
+        :return: A generator of text chunks
+        """
+        if self.__body is not None:
+            yield self.__body
+            return
+        with open(self.body_path, 'r', encoding='utf-8') as body_file:
+            for chunk in iter(lambda: body_file.read(chunk_size), ''):
+                yield chunk
+
+    def is_fresh(self, ttl):
+        """
+        Determine if this entry may be used without contacting the server
+        :param ttl: Maximum age of the entry, in seconds
+        :return: True if the entry is younger than ttl
+        """
+        return time.time() - self.stored < ttl
+
+    def get_validators(self):
+        """
+        Get the conditional request headers for revalidating this entry
+        :return: A dict of HTTP headers
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    Stores response bodies & validators on disk, in the addon profile directory
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory if directory is not None else get_profile_path(CACHE_DIR)
+
+    def get(self, url):
+        """
+        Read a cached response
+        :param url: The URL of the resource
+        :return: A CacheEntry, or None if the URL is not cached
+        """
+        meta_path, body_path = self.__get_paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(body_path):
+            return None
+        return CacheEntry(url, None, meta.get('etag'), meta.get('last_modified'),
+                          meta.get('stored'), body_path)
+
+    def put(self, url, body, etag=None, last_modified=None):
+        """
+        Save a response to the cache
+        :param url: The URL of the resource
+        :param body: The response body (text)
+        :param etag: The ETag header of the response, if any
+        :param last_modified: The Last-Modified header of the response, if any
+        :return: None
+        """
+        meta_path, body_path = self.__get_paths(url)
+        try:
+            self.__write(body_path, body)
+            self.__write_meta(meta_path, CacheEntry(url, body, etag, last_modified))
+        except OSError as err:
+            logger.warning("Could not cache response from %s: %s", url, err)
+
+    def put_stream(self, url, chunks, etag=None, last_modified=None):
+        """
+        Save a response to the cache while it is being read. Chunks are passed
+        through; the entry is only saved once all of them have been read.
+        :param url: The URL of the resource
+        :param chunks: An iterable of text chunks of the response body
+        :param etag: The ETag header of the response, if any
+        :param last_modified: The Last-Modified header of the response, if any
+        :return: A generator of the same text chunks
+        """
+        meta_path, body_path = self.__get_paths(url)
+        tmp_path = self.__get_tmp_path(body_path)
+        try:
+            out = open(tmp_path, 'w', encoding='utf-8')
+        except OSError as err:
+            logger.warning("Could not cache response from %s: %s", url, err)
+            yield from chunks
+            return
+        try:
+            with out:
+                for chunk in chunks:
+                    out.write(chunk)
+                    yield chunk
+            os.replace(tmp_path, body_path)
+            self.__write_meta(meta_path, CacheEntry(url, None, etag, last_modified))
+        finally:
+            # Left behind if reading stopped early
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def touch(self, entry):
+        """
+        Mark a cached entry as freshly validated, e.g., after a 304 response
+        :param entry: The CacheEntry which was revalidated
+        :return: None
+        """
+        entry.stored = time.time()
+        meta_path, _ = self.__get_paths(entry.url)
+        try:
+            self.__write_meta(meta_path, entry)
+        except OSError as err:
+            logger.warning("Could not update cache entry for %s: %s", entry.url, err)
+
+    def invalidate(self, url):
+        """
+        Remove a response from the cache
+        :param url: The URL of the resource
+        :return: None
+        """
+        for path in self.__get_paths(url):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @contextmanager
+    def lock(self, url, timeout=LOCK_TIMEOUT):
+        """
+        Hold a lock on a URL across processes, e.g., while fetching it. If
+        another process holds the lock, wait until it is released, so its
+        response can be read from the cache. After the timeout, carry on
+        without the lock.
+        :param url: The URL of the resource
+        :param timeout: Max. seconds to wait for the lock
+        :return: A context manager
+        """
+        lock_path = self.__get_base_path(url) + '.lock'
+        deadline = time.monotonic() + timeout
+        monitor = xbmc.Monitor()
+        held = False
+        while True:
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                held = True
+                break
+            except FileExistsError:
+                pass
+            except OSError as err:
+                logger.debug("Could not lock %s: %s", url, err)
+                break
+            try:
+                if time.time() - os.path.getmtime(lock_path) > STALE_LOCK:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                # Released meanwhile
+                continue
+            if time.monotonic() >= deadline or monitor.waitForAbort(LOCK_POLL_INTERVAL):
+                break
+        try:
+            yield
+        finally:
+            if held:
+                try:
+                    os.remove(lock_path)
+                except OSError:
+                    pass
+
+    def prune(self, max_age, max_size=MAX_CACHE_SIZE):
+        """
+        Remove entries which have not been stored or revalidated for max_age
+        seconds, then the oldest entries until the cache fits in max_size.
+        Locks & temp files left by processes which died are removed too.
+        :param max_age: Max. age of an entry, in seconds
+        :param max_size: Max. total size of the entries, in bytes
+        :return: The number of entries removed
+        """
+        now = time.time()
+        entries = {}
+        try:
+            names = os.listdir(self.directory)
+        except OSError as err:
+            logger.warning("Could not prune response cache: %s", err)
+            return 0
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Removed meanwhile
+                continue
+            if name.endswith('.lock') or name.endswith('.tmp'):
+                if now - stat.st_mtime > (STALE_LOCK if name.endswith('.lock') else STALE_TMP):
+                    self.__remove(path)
+                continue
+            # An entry is its metadata & body; the newer of the two dates it
+            key = name.split('.', 1)[0]
+            paths, mtime, size = entries.get(key, ([], 0, 0))
+            entries[key] = (paths + [path], max(mtime, stat.st_mtime), size + stat.st_size)
+        removed = 0
+        total = 0
+        kept = []
+        for paths, mtime, size in entries.values():
+            # A lone file is either being written, or left by a failed write
+            if now - mtime > max_age or (len(paths) < 2 and now - mtime > STALE_TMP):
+                removed += self.__remove(*paths)
+            else:
+                kept.append((mtime, size, paths))
+                total += size
+        # Oldest first
+        kept.sort()
+        for _, size, paths in kept:
+            if total <= max_size:
+                break
+            removed += self.__remove(*paths)
+            total -= size
+        if removed:
+            logger.debug("Pruned %d entries from the response cache", removed)
+        return removed
+
+    @staticmethod
+    def __remove(*paths):
+        """
+        :return: 1 if all paths were removed, 0 if any is in use or gone
+        """
+        try:
+            for path in paths:
+                os.remove(path)
+        except OSError:
+            return 0
+        return 1
+
+    def __get_paths(self, url):
+        base = self.__get_base_path(url)
+        return base + '.json', base + '.body'
+
+    def __get_base_path(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key)
+
+    def __write_meta(self, path, entry):
+        self.__write(path, json.dumps({
+            'url': entry.url,
+            'etag': entry.etag,
+            'last_modified': entry.last_modified,
+            'stored': entry.stored,
+        }))
+
+    @staticmethod
+    def __get_tmp_path(path):
+        return '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
+
+    def __write(self, path, data):
+        # Write to a temp file first, so readers never see a partial file
+        tmp_path = self.__get_tmp_path(path)
+        with open(tmp_path, 'w', encoding='utf-8') as out:
+            out.write(data)
+        os.replace(tmp_path, path)
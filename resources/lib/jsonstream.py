@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Incremental decoding of large JSON documents.
+"""
+
+#  Copyright (c) 2024
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import re
+
+# Discard consumed text once this much has built up
+MAX_CONSUMED = 64 * 1024
+WHITESPACE = ' \t\n\r,'
+
+_decoder = json.JSONDecoder()
+
+
+class JsonArrayStream:
+    """
+    Decodes the items of one array in a JSON document, e.g. the "matches" of
+    a page of Events, one by one from an iterable of text chunks. Only the
+    item being decoded is held in memory. Items must be objects or arrays, so
+    that an item cut off at the end of a chunk is never mistaken for a
+    complete one.
+
+    Once the items have been read, the rest of the document (with the array
+    emptied) is available as the envelope. A document without the array, e.g.
+    an empty page, has no items, and is the envelope as a whole.
+    """
+
+    def __init__(self, chunks, key):
+        self.chunks = iter(chunks)
+        self.pattern = re.compile(r'"{}"\s*:\s*\['.format(re.escape(key)))
+        self.envelope = None
+
+    def __iter__(self):
+        buffer = ''
+        match = None
+        while match is None:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.envelope = json.loads(buffer)
+                return
+            buffer += chunk
+            match = self.pattern.search(buffer)
+        # The document, up to & including the opening bracket
+        head = buffer[:match.end()]
+        buffer = buffer[match.end():]
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in WHITESPACE:
+                pos += 1
+            if pos == len(buffer):
+                buffer, pos = self.__read(''), 0
+                continue
+            if buffer[pos] == ']':
+                break
+            try:
+                item, pos = _decoder.raw_decode(buffer, pos)
+            except ValueError:
+                # Item is incomplete; read more of it
+                buffer, pos = self.__read(buffer[pos:]), 0
+                continue
+            yield item
+            if pos > MAX_CONSUMED:
+                buffer, pos = buffer[pos:], 0
+        self.envelope = json.loads(head + buffer[pos:] + ''.join(self.chunks))
+
+    def __read(self, buffer):
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            raise ValueError("Unexpected end of JSON document")
+        return buffer + chunk
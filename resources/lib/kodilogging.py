@@ -48,16 +48,15 @@ Contains logging logic for Kodi GUI
 import logging
 
 import xbmc
-import xbmcaddon
 
-from resources.lib.kodiutils import get_setting_as_bool
+from resources.lib.kodiutils import ADDON, get_setting_as_bool
 
 
 class KodiLogHandler(logging.StreamHandler):
 
     def __init__(self):
         logging.StreamHandler.__init__(self)
-        addon_id = xbmcaddon.Addon().getAddonInfo('id')
+        addon_id = ADDON.getAddonInfo('id')
         prefix = "[{}] ".format(addon_id)
         formatter = logging.Formatter(prefix + '%(name)s: %(message)s')
         self.setFormatter(formatter)
@@ -71,18 +70,23 @@ class KodiLogHandler(logging.StreamHandler):
             logging.DEBUG: xbmc.LOGDEBUG,
             logging.NOTSET: xbmc.LOGNONE,
         }
-        if get_setting_as_bool('debug'):
-            try:
-                xbmc.log(self.format(record), levels[record.levelno])
-            except UnicodeEncodeError:
-                xbmc.log(self.format(record).encode(
-                    'utf-8', 'ignore'), levels[record.levelno])
+        try:
+            xbmc.log(self.format(record), levels[record.levelno])
+        except UnicodeEncodeError:
+            xbmc.log(self.format(record).encode(
+                'utf-8', 'ignore'), levels[record.levelno])
 
     def flush(self):
         pass
 
 
 def config():
+    """
+    Configure logging for this invocation. The debug setting is read once,
+    here, from the current settings; when it is off, debug records are dropped
+    by the logger before they are formatted.
+    """
     logger = logging.getLogger()
-    logger.addHandler(KodiLogHandler())
-    logger.setLevel(logging.DEBUG)
+    if not any(isinstance(handler, KodiLogHandler) for handler in logger.handlers):
+        logger.addHandler(KodiLogHandler())
+    logger.setLevel(logging.DEBUG if get_setting_as_bool('debug') else logging.WARNING)
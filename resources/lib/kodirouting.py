@@ -133,31 +133,51 @@ GUI routing for the Matchday Kodi plugin.
 #
 #  You should have received a copy of the GNU General Public License
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import logging
 import os
 import re
 import sys
+import threading
+from contextlib import contextmanager
 
 import routing
 import xbmc
-import xbmcaddon
 import xbmcgui
 import xbmcplugin
 
-from resources.lib.model.event import Match
-from resources.lib.model.repository import CompetitionRepository, \
-    TeamRepository, VideoSourceListRepository, EventRepository
+from resources.lib import kodilogging, kodiutils
+from resources.lib.kodiutils import get_setting_as_bool, get_setting_as_int, \
+    reset_settings
+
 
 __handle__ = int(sys.argv[1])
 HLS_MIME_TYPE = 'application/mpegurl'
 GENRES = ['Sports']
-MAX_VIDEO_RETRIES = 5
+# Event link to its preferred video source, if the server provides one
+PREFERRED_VIDEO_LINK = 'preferred-video'
+# Settings
+STREAM_DECODE = 'matchday-stream-decode'
+PREFETCH_DEPTH = 'matchday-prefetch-depth'
+PRERESOLVE_COUNT = 'matchday-preresolve-count'
+PRERESOLVE_WHILE_PLAYING = 'matchday-preresolve-while-playing'
+STALE_WHILE_REVALIDATE = 'matchday-stale-while-revalidate'
+
+MORE_ICON = 'special://home/addons/plugin.matchday/resources/img/more_icon.png'
+
+logger = logging.getLogger(__name__)
 
 PLUGIN = routing.Plugin()
-# Data repositories
-EVENT_REPO = EventRepository()
-COMP_REPO = CompetitionRepository()
-TEAM_REPO = TeamRepository()
-VIDEO_SOURCE_REPO = VideoSourceListRepository()
+# Data repositories; the model layer (and requests, dateutil) is only imported
+# by routes which use it
+EVENT_REPO = 'EventRepository'
+COMP_REPO = 'CompetitionRepository'
+TEAM_REPO = 'TeamRepository'
+VIDEO_SOURCE_REPO = 'VideoSourceListRepository'
+REPOSITORIES = {}
+# Set when a listing served from expired cache data turns out to have changed;
+# cached data is then discarded by the next invocation
+STALE_CHANGED = threading.Event()
+RELOAD_LOCK = threading.Lock()
 
 
 # ==============================================================================
@@ -186,14 +206,38 @@ def list_events():
     """
     Display a list of Events
     """
-    url = None
-    if 'url' in PLUGIN.args:
-        url = PLUGIN.args['url'][0]
+    url, team_id = get_arg('url'), get_arg('team')
+    if url is None and team_id is not None:
+        # A Team's Events, opened without their link (e.g., from Favourites)
+        team = get_repository(TEAM_REPO).get_team_by_id(team_id)
+        if team is None:
+            xbmcplugin.endOfDirectory(PLUGIN.handle, succeeded=False)
+            return
+        url = team.links['events']['href']
     xbmc.log(f"Getting Events from repo at URL: {url}", xbmc.LOGINFO)
     # Get Events from repo
-    events = EVENT_REPO.get_all_events(url)
+    stream = get_setting_as_bool(STREAM_DECODE)
+    with stale_while_revalidate():
+        events = get_repository(EVENT_REPO).get_all_events(url, stream)
+    # The first page of all Events, or of a Team's, can be read from the store
+    # if the server can't be reached
+    stored = None
+    if team_id is not None:
+        stored = {'team': team_id}
+    elif url is None:
+        stored = {}
     # Display Events
-    create_events_listing(events)
+    create_events_listing(events, stored=stored)
+
+
+@PLUGIN.route('/events/stored')
+def list_stored_events():
+    """
+    Display a page of the Events in the local store, latest first
+    """
+    stored = {name: get_arg(name) for name in ('competition', 'team', 'page')}
+    xbmc.log(f"Getting stored Events: {stored}", xbmc.LOGINFO)
+    create_events_listing({'events': [], 'next': None}, stored=stored)
 
 
 @PLUGIN.route('/competitions')
@@ -205,7 +249,8 @@ def list_competitions():
     xbmcplugin.setContent(PLUGIN.handle, "mixed")
     xbmc.log("Getting all Competitions from repo", xbmc.LOGINFO)
     # Retrieve competition data from repo
-    competitions = COMP_REPO.get_all_competitions()
+    with stale_while_revalidate():
+        competitions = get_repository(COMP_REPO).get_all_competitions()
     # Display the competitions as a directory listing
     create_competition_listing(competitions)
 
@@ -219,7 +264,8 @@ def list_teams():
     if 'url' in PLUGIN.args:
         url = PLUGIN.args['url'][0]
     # Retrieve Team data from repo
-    teams = TEAM_REPO.get_all_teams(url)
+    with stale_while_revalidate():
+        teams = get_repository(TEAM_REPO).get_all_teams(url)
     # Display Teams
     create_teams_listing(teams)
 
@@ -230,7 +276,9 @@ def list_teams_by_competition_id(competition_id):
     Displays a list of teams by competition_id
     :param competition_id: The competition_id for which we want teams
     """
-    teams = COMP_REPO.get_teams_by_competition_id(competition_id)
+    teams_url = get_arg('teams')
+    teams = get_repository(COMP_REPO).get_teams_by_competition_id(competition_id,
+                                                                   teams_url)
     create_teams_listing(teams)
 
 
@@ -242,15 +290,28 @@ def show_competition(competition_id):
     :return: None
     """
     xbmc.log(f"Getting details for Competition: {competition_id}", xbmc.LOGINFO)
+    # Links are passed by the Competitions listing; look the Competition up
+    # only when opened some other way (e.g., from Favourites)
+    links = {name: get_arg(name) for name in ('events', 'teams', 'fanart')}
+    if None in links.values():
+        competition = get_repository(COMP_REPO).get_competition_by_id(competition_id)
+        if competition is None:
+            xbmcplugin.endOfDirectory(PLUGIN.handle, succeeded=False)
+            return
+        links = {name: competition.links[name]['href'] for name in links}
+    # Load the Teams while the Events are fetched, so the Teams link opens
+    # from the cache
+    from resources.lib.model.server import TEAMS
+    prefetch(links['teams'], TEAMS)
     # Display a link to the Teams for this competition_id
-    competition = COMP_REPO.get_competition_by_id(competition_id)
     team_link = xbmcgui.ListItem("Teams")
-    team_link.setArt({'fanart': competition.links['fanart']['href']})
-    xbmcplugin.addDirectoryItem(PLUGIN.handle, PLUGIN.url_for(
-        list_teams_by_competition_id, competition_id), team_link, True)
+    team_link.setArt({'fanart': links['fanart']})
+    team_item = (PLUGIN.url_for(list_teams_by_competition_id, competition_id,
+                                teams=links['teams']), team_link, True)
     # Get Events for this competition_id
-    events = COMP_REPO.get_events_by_competition_id(competition_id)
-    create_events_listing(events)
+    events = get_repository(COMP_REPO).get_events_by_competition_id(competition_id,
+                                                                    links['events'])
+    create_events_listing(events, [team_item], {'competition': competition_id})
 
 
 @PLUGIN.route('/play/<path:video_source_url>')
@@ -261,20 +322,33 @@ def play_video(video_source_url):
     :return: None
     """
     xbmc.log("Playing playlist at URL: {}".format(video_source_url), xbmc.LOGINFO)
-    # Get "best" video source
-    video_source_list = VIDEO_SOURCE_REPO.fetch_video_source_list(video_source_url)
-    video_source = video_source_list.get_preferred_source()
+    # Get "best" video source; the full list of variants is only needed when
+    # the user selects one
+    video_source = get_repository(VIDEO_SOURCE_REPO).fetch_preferred_source(
+        video_source_url, get_arg('preferred'))
+    if video_source is None:
+        xbmcplugin.setResolvedUrl(__handle__, False, xbmcgui.ListItem())
+        return
     play_video_source(video_source)
 
 
 @PLUGIN.route('/video/select_video_source/<path:video_source_url>')
 def select_video_source(video_source_url):
-    video_source_list = VIDEO_SOURCE_REPO.fetch_video_source_list(video_source_url)
-    xbmc.log("Retrieved playlist: {}".format(video_source_list), xbmc.LOGINFO)
+    video_source_list = get_repository(VIDEO_SOURCE_REPO).fetch_video_source_list(video_source_url)
+    logger.debug("Retrieved playlist: %s", video_source_list)
+    if video_source_list is None:
+        return
+
+    # Check which stream hosts are responding before the user chooses
+    xbmc.executebuiltin('ActivateWindow(busydialognocancel)')
+    try:
+        video_source_list.probe_variants()
+    finally:
+        xbmc.executebuiltin('Dialog.Close(busydialognocancel)')
 
     sources = []
     for variant in video_source_list.variants:
-        item = xbmcgui.ListItem(label="{}".format(variant))
+        item = xbmcgui.ListItem(label=get_variant_label(variant))
         sources.append(item)
 
     # display select video source dialog
@@ -283,7 +357,21 @@ def select_video_source(video_source_url):
     # handle dialog selection; -1 = cancel
     if selected_idx != -1:
         selected = video_source_list.get_variant_source(selected_idx)
-        play_video_source(selected)
+        if selected is not None:
+            play_video_source(selected)
+
+
+def get_variant_label(variant):
+    """
+    Label a video source variant with the result of probing its stream host
+    :param variant: The VideoSource
+    :return: The label
+    """
+    if variant.available:
+        return "{} - {:.0f} ms".format(variant, variant.latency * 1000)
+    if variant.available is None:
+        return "{} - no response".format(variant)
+    return "{} - unavailable".format(variant)
 
 
 def play_video_source(video_source):
@@ -291,9 +379,8 @@ def play_video_source(video_source):
     Play all items in a playlist
     """
     global __handle__
-    global MAX_VIDEO_RETRIES
 
-    xbmc.log("Playing Video Source: {}".format(video_source), xbmc.LOGINFO)
+    logger.debug("Playing Video Source: %s", video_source)
     items = video_source['uris']
 
     # begin playing first item
@@ -314,7 +401,7 @@ def play_video_source(video_source):
 
 
 def get_playlist_items(playlist):
-    xbmc.log("Parsing playlist:\n{}".format(playlist), xbmc.LOGINFO)
+    logger.debug("Parsing playlist:\n%s", playlist)
     items = []
     segments = playlist.split("\n")
     title = ""
@@ -323,7 +410,7 @@ def get_playlist_items(playlist):
             title = segment[1:].strip()
         if validate_url(segment):
             url = segment.strip()
-            xbmc.log("Media segment: title is: {}; URL is: {}".format(title, url), xbmc.LOGINFO)
+            logger.debug("Media segment: title is: %s; URL is: %s", title, url)
             items.append({'url': url, 'title': title})
     return items
 
@@ -341,29 +428,43 @@ def force_view(mode):
     Determine if view mode should be changed according to settings,
     and force the specified mode if desired
     """
-    matchday = xbmcaddon.Addon()
-    force_view_setting = matchday.getSetting('matchday-force-view')
-    if force_view_setting == 'true':
+    if get_setting_as_bool('matchday-force-view'):
         xbmc.executebuiltin(f"Container.SetViewMode({mode})")
 
 
-def create_events_listing(data):
+def create_events_listing(data, items=None, stored=None):
     """
     Creates a directory listing of Event objects
     :param data: A list of Events and a link to more
+    :param items: Directory items to display before the Events, if any
+    :param stored: If no Events are listed, e.g. because the server can't be
+    reached, list these Events from the local store instead; see add_stored_events()
     :return: None
     """
+    items = list(items) if items is not None else []
+    listed = len(items)
+    if isinstance(data, dict):
+        # Read ahead while this page is rendered; a streamed page's next link is
+        # only known once it has been read
+        prefetch_events(data['next'])
+    preresolve_count = get_preresolve_count()
     for event in data['events']:
         # Create a view for each Event
         tile = create_event_tile(event)
-        video_source_url = event.links['video']['href']
-        # Add tile to GUI with link to play item
-        xbmcplugin.addDirectoryItem(PLUGIN.handle,
-                                    PLUGIN.url_for(play_video, video_source_url),
-                                    tile)
+        # Add tile to listing with link to play item
+        items.append((get_play_url(event), tile, False))
+        if preresolve_count > 0:
+            prefetch_video_source(event)
+            preresolve_count -= 1
+    if len(items) == listed and stored is not None:
+        add_stored_events(items, **stored)
     next_url = data['next']
     if next_url is not None:
-        __create_next_button(list_events, next_url)
+        items.append(__create_next_button(list_events, next_url))
+        if not isinstance(data, dict):
+            prefetch_events(next_url)
+    # Add all tiles to GUI at once
+    xbmcplugin.addDirectoryItems(PLUGIN.handle, items, len(items))
 
     # Finish directory listing
     xbmcplugin.setContent(int(__handle__), 'episodes')
@@ -371,6 +472,141 @@ def create_events_listing(data):
     force_view(56)
 
 
+def add_stored_events(items, competition=None, team=None, page=None):
+    """
+    Add a page of the Events in the local store to a listing, latest first
+    :param items: The directory items of the listing
+    :param competition: Only include Events in the Competition with this ID
+    :param team: Only include Events in which the Team with this ID plays
+    :param page: The page number, from 0
+    :return: None
+    """
+    page = int(page or 0)
+    events = get_repository(EVENT_REPO).get_stored_events(competition, team, page)
+    for event in events['events']:
+        items.append((get_play_url(event), create_event_tile(event), False))
+    if events['more']:
+        args = {name: value for name, value in (('competition', competition),
+                                                ('team', team)) if value is not None}
+        more_button = xbmcgui.ListItem(label='More...')
+        more_button.setArt({'icon': MORE_ICON, 'thumb': MORE_ICON})
+        items.append((PLUGIN.url_for(list_stored_events, page=page + 1, **args),
+                      more_button, True))
+
+
+def get_play_url(event):
+    """
+    Get the plugin URL which plays an Event. If the server links the Event to
+    its preferred video source, the link is included, so playback can start
+    with a single request.
+    :param event: The Event to play
+    :return: The plugin URL
+    """
+    video_source_url = event.links['video']['href']
+    preferred = event.links.get(PREFERRED_VIDEO_LINK)
+    if preferred is not None:
+        return PLUGIN.url_for(play_video, video_source_url, preferred=preferred['href'])
+    return PLUGIN.url_for(play_video, video_source_url)
+
+
+def prefetch_events(next_url):
+    """
+    Load the following pages of Events into the response cache in the
+    background, so "More..." opens without waiting on the server
+    :param next_url: The link to the next page, if any
+    :return: None
+    """
+    if next_url is not None:
+        from resources.lib.model.server import EVENTS
+        prefetch(next_url['href'], EVENTS, get_setting_as_int(PREFETCH_DEPTH))
+
+
+@contextmanager
+def stale_while_revalidate():
+    """
+    If enabled in settings, data loaded within this context may come from
+    expired cache entries, so the listing shows at once. Those entries are
+    refreshed in the background; if any has changed, the listing is reloaded,
+    unless the user has moved on from it.
+    """
+    if not get_setting_as_bool(STALE_WHILE_REVALIDATE):
+        yield
+        return
+    from resources.lib.model.server import get_server
+    from resources.lib.prefetch import get_prefetcher
+    server = get_server()
+    with server.serve_stale() as stale:
+        yield
+    # The listing as Kodi reports it, e.g. plugin://plugin.matchday/events?url=...
+    folder_path = sys.argv[0] + sys.argv[2]
+    for url, resource, entry in stale:
+        logger.debug("Served stale response for %s; refreshing", url)
+        get_prefetcher().submit(refresh_stale, server, url, resource, entry,
+                                folder_path)
+
+
+def refresh_stale(server, url, resource, entry, folder_path, cancelled):
+    """
+    Background task which revalidates a response served stale, and reloads
+    the listing if it has changed
+    """
+    if not server.refresh(url, resource, entry, cancelled) or cancelled.is_set():
+        return
+    with RELOAD_LOCK:
+        if STALE_CHANGED.is_set():
+            # Another response of the listing changed too
+            return
+        STALE_CHANGED.set()
+    # Data kept from the stale responses is discarded by the next invocation
+    server.store.expire()
+    if xbmc.getInfoLabel('Container.FolderPath') == folder_path:
+        logger.debug("Stale listing has changed; reloading")
+        xbmc.executebuiltin('Container.Refresh')
+
+
+def get_preresolve_count():
+    """
+    Get the number of Events at the top of a listing for which video sources
+    are resolved in the background. None are while video is playing, unless
+    settings allow it.
+    :return: The number of Events
+    """
+    count = get_setting_as_int(PRERESOLVE_COUNT)
+    if count > 0 and not get_setting_as_bool(PRERESOLVE_WHILE_PLAYING) \
+            and xbmc.Player().isPlaying():
+        return 0
+    return count
+
+
+def prefetch_video_source(event):
+    """
+    Load an Event's preferred video source into the response cache in the
+    background, so it plays without waiting on the server
+    :param event: The Event
+    :return: None
+    """
+    from resources.lib.prefetch import get_prefetcher
+    preferred = event.links.get(PREFERRED_VIDEO_LINK)
+    get_prefetcher().submit(get_repository(VIDEO_SOURCE_REPO).prefetch_preferred_source,
+                            event.links['video']['href'],
+                            preferred['href'] if preferred is not None else None)
+
+
+def prefetch(url, resource, depth=1):
+    """
+    Load pages of a resource into the response cache in the background
+    :param url: The URL of the first page
+    :param resource: The type of resource
+    :param depth: The max. number of pages to load
+    :return: None
+    """
+    if depth <= 0:
+        return
+    from resources.lib.model.server import get_server
+    from resources.lib.prefetch import get_prefetcher
+    get_prefetcher().submit(get_server().prefetch_pages, url, resource, depth)
+
+
 def create_event_tile(event):
     """
     Creates an Event tile (view) for use in the GUI
@@ -379,7 +615,7 @@ def create_event_tile(event):
     """
     global __handle__
 
-    xbmc.log("Creating Event tile: {}".format(event), xbmc.LOGINFO)
+    logger.debug("Creating Event tile: %s", event)
     list_item = xbmcgui.ListItem(label=event.title)
     list_item.setProperty('IsPlayable', 'true')
     list_item.setProperty('EventDate', event.date.strftime("%d/%m"))
@@ -402,6 +638,7 @@ def create_event_tile(event):
     select_video = PLUGIN.url_for(select_video_source, playlist_url)
     list_item.addContextMenuItems([('Select source...', 'PlayMedia(%s)' % select_video)])
 
+    from resources.lib.model.event import Match
     if isinstance(event, Match):
         # Set Match-specific properties
         list_item.setProperty('IsMatch', 'true')
@@ -423,11 +660,9 @@ def create_event_tile(event):
 
 
 def __create_next_button(action, next_url):
-    plus_icon = 'special://home/addons/plugin.matchday/resources/img/more_icon.png'
     next_button = xbmcgui.ListItem(label='More...')
-    next_button.setArt({'icon': plus_icon, 'thumb': plus_icon})
-    xbmcplugin.addDirectoryItem(PLUGIN.handle, PLUGIN.url_for(
-        action, url=next_url['href']), next_button, True)
+    next_button.setArt({'icon': MORE_ICON, 'thumb': MORE_ICON})
+    return PLUGIN.url_for(action, url=next_url['href']), next_button, True
 
 
 def create_competition_listing(competitions):
@@ -436,6 +671,7 @@ def create_competition_listing(competitions):
     :param competitions: A list of competition objects
     :return: None
     """
+    items = []
     for competition in competitions:
         title = competition.name
         comp_id = competition.comp_id
@@ -452,9 +688,12 @@ def create_competition_listing(competitions):
             'clearart': thumb
         })
         # Add list item to listing
-        xbmcplugin.addDirectoryItem(PLUGIN.handle,
-                                    PLUGIN.url_for(show_competition, comp_id),
-                                    list_item, True)
+        # Pass the links on, so the Competition needn't be looked up again
+        url = PLUGIN.url_for(show_competition, comp_id,
+                             events=competition.links['events']['href'],
+                             teams=competition.links['teams']['href'], fanart=fanart)
+        items.append((url, list_item, True))
+    xbmcplugin.addDirectoryItems(PLUGIN.handle, items, len(items))
     # Ensure Kodi ignores "the" at beginning
     xbmcplugin.addSortMethod(PLUGIN.handle,
                              xbmcplugin.SORT_METHOD_LABEL_IGNORE_THE)
@@ -470,6 +709,7 @@ def create_teams_listing(data):
     :param data: A list of teams to be rendered & a link to more
     :return: None
     """
+    items = []
     for team in data['teams']:
         title = '{}'.format(team)
         thumb = team.links['emblem']['href']
@@ -481,12 +721,12 @@ def create_teams_listing(data):
         video_info.setTitle(title)
         video_info.setGenres(GENRES)
         # Add list item to listing
-        xbmcplugin.addDirectoryItem(PLUGIN.handle,
-                                    PLUGIN.url_for(list_events, url=events_url),
-                                    list_item, True)
+        items.append((PLUGIN.url_for(list_events, url=events_url, team=team.team_id),
+                      list_item, True))
     next_url = data['next']
     if next_url is not None:
-        __create_next_button(list_teams, next_url)
+        items.append(__create_next_button(list_teams, next_url))
+    xbmcplugin.addDirectoryItems(PLUGIN.handle, items, len(items))
     # Ensure Kodi ignores "the"
     xbmcplugin.addSortMethod(PLUGIN.handle,
                              xbmcplugin.SORT_METHOD_LABEL_IGNORE_THE)
@@ -496,18 +736,91 @@ def create_teams_listing(data):
     force_view(56)
 
 
+def get_arg(name):
+    """
+    Get a query argument of the current plugin URL
+    :param name: The name of the argument
+    :return: Its (first) value, or None if not given
+    """
+    values = PLUGIN.args.get(name)
+    return values[0] if values else None
+
+
+def get_repository(name):
+    """
+    Get a data repository, creating it on first use
+    :param name: The repository class name
+    :return: The repository
+    """
+    repository = REPOSITORIES.get(name)
+    if repository is None:
+        from resources.lib.model import repository as repositories
+        repository = REPOSITORIES[name] = getattr(repositories, name)()
+    return repository
+
+
+def __reset_repositories():
+    """
+    Keep cached repositories for this invocation, unless the server they were
+    loaded from is no longer the configured one, or data served stale has
+    since changed. Shared entities are always discarded, and background
+    fetches of earlier invocations cancelled.
+    """
+    from resources.lib.model.identity_map import IDENTITY_MAP
+    from resources.lib.model.server import get_server
+    from resources.lib.prefetch import get_prefetcher
+    from resources.lib.transport import get_transport
+    get_prefetcher().cancel_finished()
+    get_transport().reset_stats()
+    # Entities are re-built from this invocation's data, so changes are shown
+    IDENTITY_MAP.clear()
+    server = get_server()
+    if STALE_CHANGED.is_set() or \
+            any(repository.server is not server for repository in REPOSITORIES.values()):
+        STALE_CHANGED.clear()
+        REPOSITORIES.clear()
+
+
 def get_default_fanart():
     """
     Gets the default fanart image from the 'resources' directory.
     :return: Default fanart image
     """
-    addon = xbmcaddon.Addon()
-    return os.path.join(addon.getAddonInfo('path'), 'resources',
+    return os.path.join(kodiutils.ADDON.getAddonInfo('path'), 'resources',
                         'img', 'fanart.jpg')
 
 
 def run():
     """
-    Wrap the plugin run() method
+    Wrap the plugin run() method. With reuselanguageinvoker, this module (and
+    the repositories' caches) outlive a single invocation, so per-invocation
+    state is re-bound here.
+    """
+    global __handle__
+    __handle__ = int(sys.argv[1])
+    PLUGIN.handle = __handle__
+    reset_settings()
+    kodilogging.config()
+    if REPOSITORIES:
+        __reset_repositories()
+    try:
+        PLUGIN.run()
+    finally:
+        if REPOSITORIES:
+            __finish_invocation()
+
+
+def __finish_invocation():
+    """
+    Leave background fetches running, without waiting for them, save the
+    throughput estimate and report HTTP stats
     """
-    PLUGIN.run()
+    from resources.lib.prefetch import get_prefetcher
+    from resources.lib.throughput import save_throughput
+    get_prefetcher().finish()
+    save_throughput()
+    if logger.isEnabledFor(logging.DEBUG):
+        from resources.lib.transport import get_transport
+        stats = get_transport().get_stats()
+        logger.debug("HTTP requests: %(requests)d, connections opened: "
+                     "%(connections)d, reused: %(reused)d", stats)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Background service which keeps the catalog response cache warm, so listings
+open without waiting on the server.
+"""
+
+#  Copyright (c) 2024
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import time
+
+import xbmc
+
+from resources.lib.kodiutils import get_setting_as_bool, get_setting_as_int, \
+    reset_settings
+
+PREFETCH_ENABLED = 'matchday-prefetch-enabled'
+PREFETCH_INTERVAL = 'matchday-prefetch-interval'
+# Seconds to wait before checking again while video is playing
+PLAYBACK_BACKOFF = 60
+# Seconds to wait after Kodi starts before the first refresh
+STARTUP_DELAY = 10
+# Seconds between clean-ups of cached data
+PRUNE_INTERVAL = 24 * 60 * 60
+
+logger = logging.getLogger(__name__)
+
+
+def refresh_catalog():
+    """
+    Revalidate the roots document, competitions and the first pages of
+    latest Events & Teams in the response cache
+    :return: None
+    """
+    # Imported here, so the service costs nothing while prefetch is disabled
+    from resources.lib.model.identity_map import IDENTITY_MAP
+    from resources.lib.model.repository import CompetitionRepository, \
+        EventRepository, TeamRepository
+    from resources.lib.model.server import Server
+    from resources.lib.throughput import save_throughput
+
+    # Build entities afresh from this cycle's data, as plugin invocations do
+    IDENTITY_MAP.clear()
+    server = Server(revalidate=True, notify_errors=False)
+    server.get_roots()
+    CompetitionRepository(server).get_all_competitions()
+    EventRepository(server).get_all_events()
+    TeamRepository(server).get_all_teams()
+    save_throughput()
+
+
+def prune_caches():
+    """
+    Remove old data from the response cache and local store
+    :return: None
+    """
+    from resources.lib.model.server import Server
+
+    Server(notify_errors=False).prune()
+
+
+def get_interval():
+    """
+    Get the time between catalog refreshes
+    :return: The interval, in seconds
+    """
+    return max(get_setting_as_int(PREFETCH_INTERVAL), 1) * 60
+
+
+def run():
+    """
+    Service loop; refreshes the catalog on schedule until Kodi exits
+    """
+    monitor = xbmc.Monitor()
+    player = xbmc.Player()
+    wait = STARTUP_DELAY
+    pruned = None
+    while not monitor.waitForAbort(wait):
+        reset_settings()
+        if (pruned is None or time.monotonic() - pruned >= PRUNE_INTERVAL) \
+                and not player.isPlayingVideo():
+            try:
+                prune_caches()
+            except Exception as err:
+                logger.warning("Could not prune caches: %s", err)
+            pruned = time.monotonic()
+        if not get_setting_as_bool(PREFETCH_ENABLED):
+            wait = get_interval()
+            continue
+        if player.isPlayingVideo():
+            # Don't compete with the video stream for bandwidth
+            wait = PLAYBACK_BACKOFF
+            continue
+        try:
+            refresh_catalog()
+            logger.debug("Refreshed catalog cache")
+        except Exception as err:
+            logger.warning("Could not refresh catalog cache: %s", err)
+        wait = get_interval()
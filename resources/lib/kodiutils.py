@@ -43,13 +43,17 @@
 
 import json as json
 import logging
+import os
 
 import xbmc
 import xbmcaddon
 import xbmcgui
+import xbmcvfs
 
 # read settings
 ADDON = xbmcaddon.Addon()
+# Settings read during this invocation
+SETTINGS = {}
 
 logger = logging.getLogger(__name__)
 
@@ -64,11 +68,27 @@ def show_settings():
 
 
 def get_setting(setting):
-    return ADDON.getSetting(setting).strip()
+    value = SETTINGS.get(setting)
+    if value is None:
+        value = SETTINGS[setting] = ADDON.getSetting(setting).strip()
+    return value
 
 
 def set_setting(setting, value):
     ADDON.setSetting(setting, str(value))
+    SETTINGS[setting] = str(value).strip()
+
+
+def reset_settings():
+    """
+    Discard settings read so far, so they are re-read from Kodi when next used.
+    An Addon instance only sees the settings as they were when it was created,
+    so if any were read, a new one is made as well.
+    """
+    global ADDON
+    if SETTINGS:
+        ADDON = xbmcaddon.Addon()
+        SETTINGS.clear()
 
 
 def get_setting_as_bool(setting):
@@ -89,6 +109,13 @@ def get_setting_as_int(setting):
         return 0
 
 
+def get_profile_path(*paths):
+    path = os.path.join(xbmcvfs.translatePath(ADDON.getAddonInfo('profile')), *paths)
+    if not xbmcvfs.exists(path):
+        xbmcvfs.mkdirs(path)
+    return path
+
+
 def get_string(string_id):
     return ADDON.getLocalizedString(string_id).encode('utf-8', 'ignore')
 
@@ -45,10 +45,14 @@ Competition (sports league)
 #  You should have received a copy of the GNU General Public License
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+from resources.lib.model.identity_map import IDENTITY_MAP, merge_links
+
+
 class Competition(object):
     """
     Represents a competition_id (sports league)
     """
+    __slots__ = ('comp_id', 'name', 'links')
 
     def __init__(self, comp_id, name, links):
         self.comp_id = comp_id
@@ -58,12 +62,17 @@ class Competition(object):
     @staticmethod
     def create_competition(competition_data):
         """
-        Factory method to create a competition_id from JSON data
+        Factory method to create a competition_id from JSON data. Each
+        Competition is built only once per invocation.
         :param competition_data: The JSON data representing a competition_id
         :return: a Competition object
         """
-        return Competition(competition_data['id'], competition_data['name']['name'],
-                           competition_data['_links'])
+        comp_id = competition_data['id']
+        competition = IDENTITY_MAP.get(Competition, comp_id)
+        if competition is not None:
+            return merge_links(competition, competition_data['_links'])
+        return IDENTITY_MAP.put(Competition, comp_id, Competition(
+            comp_id, competition_data['name']['name'], competition_data['_links']))
 
     def __str__(self):
         return self.name
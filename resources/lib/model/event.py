@@ -47,8 +47,6 @@ concretions, Match and Highlight Show.
 
 from datetime import datetime
 
-import dateutil.parser
-
 from resources.lib.model.competition import Competition
 from resources.lib.model.team import Team
 
@@ -57,6 +55,8 @@ class Event(object):
     """
     Represents a sporting event
     """
+    __slots__ = ('event_id', 'date', 'title', 'competition', 'fixture',
+                 'season', 'links')
 
     def __init__(self, event_id, date, title, competition, fixture, season,
                  links):
@@ -80,7 +80,7 @@ class Event(object):
         """
         # Format date
         try:
-            date = dateutil.parser.parse("{}".format(event_data['date']))
+            date = parse_date(event_data['date'])
         except TypeError:
             date = datetime.now()
 
@@ -106,10 +106,29 @@ class Event(object):
         return Event(event_id, date, title, competition, fixture, season, links)
 
 
+def parse_date(date):
+    """
+    Parse an Event timestamp. The server sends ISO-8601, which
+    datetime.fromisoformat() handles directly; dateutil is only loaded for
+    anything it cannot read.
+    :param date: The timestamp string
+    :return: A datetime
+    """
+    try:
+        if isinstance(date, str) and date.endswith('Z'):
+            # fromisoformat() only accepts 'Z' from Python 3.11
+            return datetime.fromisoformat(date[:-1] + '+00:00')
+        return datetime.fromisoformat(date)
+    except ValueError:
+        import dateutil.parser
+        return dateutil.parser.parse(date)
+
+
 class Match(Event):
     """
     Represents a football match - a meeting between two teams.
     """
+    __slots__ = ('home_team', 'away_team')
 
     def __init__(self, event_id, date, title, competition, fixture, season,
                  links, home_team, away_team):
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Identity map for entities shared between many Events (Competitions & Teams).
+"""
+
+#  Copyright (c) 2024
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+class IdentityMap:
+    """
+    Holds a single instance of each entity, by type & ID, so that a page of
+    Events shares one object per Competition or Team
+    """
+
+    def __init__(self):
+        self.entities = {}
+
+    def get(self, kind, entity_id):
+        """
+        Get an entity from the map
+        :param kind: The type of the entity
+        :param entity_id: The ID of the entity
+        :return: The entity, or None if it has not been mapped
+        """
+        return self.entities.get((kind, entity_id))
+
+    def put(self, kind, entity_id, entity):
+        """
+        Add an entity to the map
+        :param kind: The type of the entity
+        :param entity_id: The ID of the entity
+        :param entity: The entity
+        :return: The entity
+        """
+        self.entities[(kind, entity_id)] = entity
+        return entity
+
+    def seed(self, kind, entities, get_id):
+        """
+        Add already-built entities to the map, e.g. from a repository
+        :param kind: The type of the entities
+        :param entities: An iterable of entities
+        :param get_id: Function which returns the ID of an entity
+        :return: None
+        """
+        for entity in entities:
+            self.entities[(kind, get_id(entity))] = entity
+
+    def clear(self):
+        """
+        Empty the map
+        :return: None
+        """
+        self.entities.clear()
+
+
+def merge_links(entity, links):
+    """
+    Entities embedded in other resources may carry fewer links than the full
+    resource; prefer the richer set
+    :param entity: A mapped entity
+    :param links: Links from another representation of the same entity
+    :return: The entity
+    """
+    if links is not None and len(links) > len(entity.links):
+        entity.links = links
+    return entity
+
+
+# Shared by all model factories for this invocation
+IDENTITY_MAP = IdentityMap()
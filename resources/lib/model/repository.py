@@ -58,10 +58,29 @@ Represents data repositories.
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
-import xbmc
+import logging
+import time
+from operator import attrgetter
 
+from resources.lib.kodiutils import get_setting, get_setting_as_bool
+from resources.lib.model.competition import Competition
+from resources.lib.model.event import Event
+from resources.lib.model.identity_map import IDENTITY_MAP
+from resources.lib.model.team import Team
 from resources.lib.model.videosourcelist import VideoSourceList
-from resources.lib.model.server import Server
+from resources.lib.model.server import get_server, CACHE_TTL, COMPETITIONS, \
+    TEAMS
+from resources.lib.model.store import ALL_COMPETITIONS
+from resources.lib.throughput import get_throughput
+
+# Settings
+AUTO_QUALITY = 'matchday-auto-quality'
+PREFERRED_LANGUAGE = 'matchday-preferred-language'
+PREFERRED_CODEC = 'matchday-preferred-codec'
+# Events per page when paging through the local store
+STORE_PAGE_SIZE = 20
+
+logger = logging.getLogger(__name__)
 
 
 class EventRepository:
@@ -69,35 +88,43 @@ class EventRepository:
     Local cache of Events; controls data refresh for Events
     """
 
-    def __init__(self):
-        self.server = Server()
+    def __init__(self, server=None):
+        self.server = server if server is not None else get_server()
         self.events = None
 
-    def __fetch_events(self, url=None):
+    def __fetch_events(self, url=None, stream=False):
         """
         Refreshes local Event data cache
         """
-        self.events = self.server.get_all_events(url)
+        self.events = self.server.get_all_events(url, stream)
 
-    def get_all_events(self, url=None):
+    def get_all_events(self, url=None, stream=False):
         """
         Fetches Events
+        :param url: The URL of a page of Events; the latest Events if None
+        :param stream: Decode Events while the page downloads
         :return: A list of all latest Events
         """
-        self.__fetch_events(url)
+        self.__fetch_events(url, stream)
         return self.events
 
-    def get_event_by_id(self, event_id):
+    def get_stored_events(self, comp_id=None, team_id=None, page=0,
+                          size=STORE_PAGE_SIZE, descending=True):
         """
-        Retrieves a specific Event based on the eventId
-        :param event_id: The ID of the Event
-        :return: The requested Event, or None if not found
+        Page through Events in the local store, without contacting the server
+        :param comp_id: Only include Events in this Competition
+        :param team_id: Only include Events in which this Team plays
+        :param page: The page number, from 0
+        :param size: The number of Events per page
+        :param descending: Sort latest Events first
+        :return: A page of Events, and whether there are more
         """
-        for event in self.events:
-            if event.event_id == event_id:
-                return event
-        # ID not found
-        return None
+        data = self.server.store.get_events(comp_id, team_id, size + 1, page * size,
+                                            descending)
+        return {
+            "events": list(map(Event.create_event, data[:size])),
+            "more": len(data) > size,
+        }
 
 
 class CompetitionRepository:
@@ -105,23 +132,45 @@ class CompetitionRepository:
     Represents a Competition data store.
     """
 
-    def __init__(self):
-        self.server = Server()
+    def __init__(self, server=None):
+        self.server = server if server is not None else get_server()
         self.competitions = None
+        self.competitions_by_id = {}
+        self.loaded = 0
 
     def __fetch_competitions(self):
         """
-        Retrieve all competitions from remote data server.
+        Retrieve all competitions from the local store if it is up to date, or
+        else from remote data server.
+        """
+        store = self.server.store
+        if store.is_fresh(ALL_COMPETITIONS, CACHE_TTL[COMPETITIONS]):
+            self.competitions = list(map(Competition.create_competition,
+                                         store.get_competitions()))
+        else:
+            self.competitions = self.server.get_all_competitions()
+        self.competitions_by_id = {
+            competition.comp_id: competition for competition in self.competitions}
+        if self.competitions:
+            # An empty list means the server could not be reached; try again
+            self.loaded = time.monotonic()
+        self.seed_identity_map()
+
+    def seed_identity_map(self):
+        """
+        Make the cached Competitions the shared instances for this invocation
         """
-        self.competitions = self.server.get_all_competitions()
+        if self.competitions is not None:
+            IDENTITY_MAP.seed(Competition, self.competitions, attrgetter('comp_id'))
 
     def get_all_competitions(self):
         """
         Get all competitions
         :return: List of Competitions from the remote server
         """
-        # If competition data is empty, refresh
-        if self.competitions is None:
+        # If competition data is empty or expired, refresh
+        if self.competitions is None or \
+                time.monotonic() - self.loaded > CACHE_TTL[COMPETITIONS]:
             self.__fetch_competitions()
         return self.competitions
 
@@ -131,32 +180,39 @@ class CompetitionRepository:
         :param comp_id: The ID of the competition
         :return: The requested competition, or None if not found
         """
-        for competition in self.get_all_competitions():
-            if competition.comp_id == comp_id:
-                return competition
-        # Not found
-        return None
+        if self.competitions is None:
+            # Try the local store before loading all competitions
+            competition_data = self.server.store.get_competition(comp_id)
+            if competition_data is not None:
+                return Competition.create_competition(competition_data)
+        self.get_all_competitions()
+        return self.competitions_by_id.get(comp_id)
 
-    def get_events_by_competition_id(self, comp_id):
+    def get_events_by_competition_id(self, comp_id, events_url=None):
         """
         Get all events for a specific competition
         :param comp_id: The ID of the competition
+        :param events_url: The link to the competition's Events, if known
         :return: A list of Events
         """
-        competition = self.get_competition_by_id(comp_id)
-        xbmc.log(f'Using ID: {comp_id}, found Competition in memory: {competition}',
-                 1)
-        comp_events = self.server.get_events_by_competition(competition)
-        return comp_events
+        if events_url is None:
+            competition = self.get_competition_by_id(comp_id)
+            logger.debug('Using ID: %s, found Competition in memory: %s', comp_id,
+                         competition)
+            events_url = competition.links['events']['href']
+        return self.server.get_events_by_competition(events_url)
 
-    def get_teams_by_competition_id(self, competition_id):
+    def get_teams_by_competition_id(self, competition_id, teams_url=None):
         """
         Get all Teams for a given competition
         :param competition_id: The ID of the Competition
+        :param teams_url: The link to the Competition's Teams, if known
         :return: A list of Teams
         """
-        competition = self.get_competition_by_id(competition_id)
-        return self.server.get_teams_by_competition(competition)
+        if teams_url is None:
+            competition = self.get_competition_by_id(competition_id)
+            teams_url = competition.links['teams']['href']
+        return self.server.get_teams_by_competition(teams_url)
 
 
 class TeamRepository:
@@ -164,9 +220,12 @@ class TeamRepository:
     Represents the local data store for Team objects
     """
 
-    def __init__(self):
-        self.server = Server()
+    def __init__(self, server=None):
+        self.server = server if server is not None else get_server()
         self.teams = None
+        self.teams_by_id = {}
+        self.teams_url = None
+        self.loaded = 0
 
     def __fetch_teams(self, url=None):
         """
@@ -174,21 +233,42 @@ class TeamRepository:
         :return: None
         """
         self.teams = self.server.get_all_teams(url)
+        # Only the page held is indexed, so the index doesn't outgrow it
+        self.teams_by_id = {team.team_id: team for team in self.teams['teams']}
+        self.teams_url = url
+        self.loaded = time.monotonic() if self.teams['teams'] else 0
+        self.seed_identity_map()
+
+    def seed_identity_map(self):
+        """
+        Make the cached Teams the shared instances for this invocation
+        """
+        if self.teams is not None:
+            IDENTITY_MAP.seed(Team, self.teams['teams'], attrgetter('team_id'))
 
     def get_all_teams(self, url=None):
         """
         Gets all team objects from local data store
         :return: A list of Team objects
         """
-        # If the local data store is empty, update
-        if self.teams is None:
+        # If the local data store is empty, expired or holds another page, update
+        if self.teams is None or url != self.teams_url or \
+                time.monotonic() - self.loaded > CACHE_TTL[TEAMS]:
             self.__fetch_teams(url)
         return self.teams
 
-    def __find_team_by_id(self, team_id):
-        for team in self.teams:
-            if team.team_id == team_id:
-                return team
+    def get_team_by_id(self, team_id):
+        """
+        Get a specific Team, from the page of Teams held or the local store
+        :param team_id: The ID of the Team
+        :return: The requested Team, or None if not found
+        """
+        team = self.teams_by_id.get(team_id)
+        if team is None:
+            team_data = self.server.store.get_team(team_id)
+            if team_data is not None:
+                team = Team.create_team(team_data)
+        return team
 
 
 class VideoSourceListRepository:
@@ -196,8 +276,8 @@ class VideoSourceListRepository:
     Represents the local data access to media playlists on remote server
     """
 
-    def __init__(self):
-        self.server = Server()
+    def __init__(self, server=None):
+        self.server = server if server is not None else get_server()
         self.playlists = []
 
     def fetch_video_source_list(self, url):
@@ -205,8 +285,55 @@ class VideoSourceListRepository:
         Fetch playlist data from remote server; create a VideoSourceList instance
         from the data & return
         :param url: The URL of the playlist
-        :return: a VideoSourceList instance
+        :return: a VideoSourceList instance, or None if it could not be retrieved
         """
-        xbmc.log("Retrieving video playlist data from URL: {}".format(url), xbmc.LOGINFO)
+        logger.debug("Retrieving video playlist data from URL: %s", url)
         source_json = self.server.get_video_source_list(url)
+        if source_json is None:
+            return None
         return VideoSourceList.create_video_source_list(source_json)
+
+    def fetch_preferred_source(self, url, preferred_url=None):
+        """
+        Fetch the video source to play from a playlist. If automatic quality
+        is on and the client's throughput is known, the variant which fits it
+        best is chosen from the playlist; otherwise, the server's preferred
+        source is used, and the playlist is only read if its link is not known.
+        Both may come from the response cache, e.g. if pre-resolved.
+        :param url: The URL of the playlist
+        :param preferred_url: The URL of the preferred video source, if known
+        :return: The video source JSON, or None if it could not be retrieved
+        """
+        get_source_url = self.get_source_chooser()
+        if preferred_url is None or get_source_url is not None:
+            source_json = self.server.get_video_source_list(url)
+            if source_json is None:
+                return None
+            preferred_url = get_source_url(source_json) if get_source_url is not None \
+                else source_json['_links']['preferred']['href']
+        return self.server.get_video_source(preferred_url)
+
+    def prefetch_preferred_source(self, url, preferred_url, cancelled):
+        """
+        Load the video source fetch_preferred_source() would play (and the
+        playlist, if needed to choose it) into the response cache
+        :param url: The URL of the playlist
+        :param preferred_url: The URL of the preferred video source, if known
+        :param cancelled: Event which is set to stop loading
+        :return: None
+        """
+        self.server.prefetch_video_source(url, preferred_url, cancelled,
+                                          self.get_source_chooser())
+
+    @staticmethod
+    def get_source_chooser():
+        """
+        :return: A function which returns the URL of the variant to play from
+        playlist JSON, or None if the server's preferred source is played
+        """
+        bandwidth = get_throughput().get_mbps()
+        if bandwidth is None or not get_setting_as_bool(AUTO_QUALITY):
+            return None
+        language, codec = get_setting(PREFERRED_LANGUAGE), get_setting(PREFERRED_CODEC)
+        return lambda source_json: VideoSourceList.create_video_source_list(
+            source_json).get_preferred_url(bandwidth, language, codec)
@@ -109,78 +109,407 @@ Represents remote data server.
 #  You should have received a copy of the GNU General Public License
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import hashlib
 import json
+import logging
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from http.client import HTTPException
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
-import requests
 import xbmc
-import xbmcaddon
+from requests import HTTPError
 
-from resources.lib.kodiutils import notification
+from resources.lib.cache import ResponseCache
+from resources.lib.jsonstream import JsonArrayStream
+from resources.lib.kodiutils import get_setting, get_setting_as_int, notification, \
+    set_setting
 from resources.lib.model.competition import Competition
 from resources.lib.model.event import Event
+from resources.lib.model.store import get_store, ALL_COMPETITIONS
 from resources.lib.model.team import Team
+from resources.lib.singleflight import SingleFlight
+from resources.lib.transport import get_transport
 
 SERVER_ADDRESS = 'matchday-server-address'
+PAGE_SIZE = 'matchday-page-size'
+PAGES_PER_LISTING = 'matchday-pages-per-listing'
+VIDEO_CACHE_TTL = 'matchday-video-cache-ttl'
+MAX_STALE = 'matchday-max-stale'
+
+logger = logging.getLogger(__name__)
+
+_server = None
+
+# Resource types, and how long (seconds) each may be served from cache before
+# being revalidated with the server
+ROOTS = 'roots'
+COMPETITIONS = 'competitions'
+TEAMS = 'teams'
+EVENTS = 'events'
+VIDEO_SOURCES = 'video-sources'
+VIDEO_SOURCE = 'video-source'
+CACHE_TTL = {
+    ROOTS: 24 * 60 * 60,
+    COMPETITIONS: 6 * 60 * 60,
+    TEAMS: 60 * 60,
+    EVENTS: 5 * 60,
+    VIDEO_SOURCES: 60,
+    VIDEO_SOURCE: 60,
+}
+# Cached responses are kept this long after they expire, for revalidation
+CACHE_KEEP = 24 * 60 * 60
+# How long the local store keeps data the server no longer returns, in seconds
+STORE_KEEP = 30 * 24 * 60 * 60
+# Retries of failed requests, where more than the transport's default are
+# worth the wait
+MAX_VIDEO_RETRIES = 5
+RETRIES = {
+    VIDEO_SOURCES: MAX_VIDEO_RETRIES,
+    VIDEO_SOURCE: MAX_VIDEO_RETRIES,
+}
+# Characters decoded at a time when streaming a response
+STREAM_CHUNK_SIZE = 16 * 1024
+# Events saved to the local store at a time when streaming a page
+STREAM_STORE_BATCH = 20
+# Max. pages fetched at once when several are shown in one listing
+MAX_PAGE_WORKERS = 4
 
 
 class Server:
     """Represents the remote data server"""
 
-    def __init__(self):
+    def __init__(self, revalidate=False, notify_errors=True):
         """
         Initialize remote server url
+        :param revalidate: Check cached responses with the server even if they
+        have not expired
+        :param notify_errors: Show errors in the GUI, rather than only logging
+        them
         """
-        matchday = xbmcaddon.Addon()
-        address = matchday.getSetting(SERVER_ADDRESS)
-        if not re.match("^https?://", address):
-            address = 'http://' + address
-            # fix setting
-            matchday.setSetting(SERVER_ADDRESS, address)
-        self.url = address
+        self.url = get_server_url()
+        self.revalidate = revalidate
+        self.notify_errors = notify_errors
         self.roots = None
+        self.cache = ResponseCache()
+        self.store = get_store(self.url)
+        self.transport = get_transport()
+        self.flights = SingleFlight()
+        # The stale responses served by each thread; see serve_stale()
+        self.__serving = threading.local()
 
-    @staticmethod
-    def get_json(url):
+    def get_json(self, url, resource=None):
         """
         Retrieves JSON data from the specified URL
+        :param url: The location of the data
+        :param resource: The type of resource, which determines how long it may
+        be cached
+        """
+        try:
+            return self.__load(url, resource)
+        except Exception as err:
+            self.__notify_error(url, err)
+
+    def get_root_json(self, name, resource=None, paged=False):
+        """
+        Retrieves JSON data from one of the links in the roots document. If the
+        link is dead, the roots are rediscovered and the request retried once.
+        :param name: The name of the root link
+        :param resource: The type of resource, which determines how long it may
+        be cached
+        :param paged: Request the page size chosen in settings
         """
+        url = None
         try:
-            remote_data = requests.get(url).text
-            return json.loads(remote_data)
-        except HTTPException as http_err:
-            notification("Error fetching JSON", f'Location: {url}\n{http_err}')
+            roots = self.get_roots()
+            if not roots:
+                # Could not be read; already reported
+                return None
+            url = roots[name]['href']
+            if paged:
+                url = get_page_url(url)
+            try:
+                return self.__load(url, resource)
+            except HTTPError as err:
+                if err.response is None or err.response.status_code != 404:
+                    raise
+            xbmc.log(f'Root link "{name}" not found at: {url}; reloading roots',
+                     xbmc.LOGWARNING)
+            self.invalidate_roots()
+            roots = self.get_roots()
+            if not roots:
+                return None
+            url = roots[name]['href']
+            if paged:
+                url = get_page_url(url)
+            return self.__load(url, resource)
         except Exception as err:
+            self.__notify_error(url, err)
+
+    def __notify_error(self, url, err):
+        if not self.notify_errors:
+            logger.warning('Error when fetching from %s: %s', url, err)
+        elif isinstance(err, HTTPException):
+            notification("Error fetching JSON", f'Location: {url}\n{err}')
+        else:
             notification("Error", f'Error when fetching from {url}\n{err}')
 
+    def __load(self, url, resource, stale=None):
+        """
+        Read & decode a JSON resource. Concurrent loads of the same URL share
+        one fetch & decode.
+        :param stale: The stale responses served for a listing, when loading
+        for it on another thread; see serve_stale()
+        """
+        if stale is None:
+            stale = self.__get_stale()
+        return self.flights.run(url, lambda: json.loads(self.__fetch(url, resource, stale)))
+
+    def __fetch(self, url, resource, stale):
+        """
+        Read the body of a resource, from the response cache if it is fresh, or
+        else from the server, revalidating any cached copy. Only one process
+        at a time fetches a cacheable resource; others wait, then read it from
+        the cache.
+        """
+        ttl = get_cache_ttl(resource)
+        if ttl is None:
+            return self.__download(url, resource)
+        entry = self.cache.get(url)
+        if entry is not None and not self.revalidate:
+            if entry.is_fresh(ttl):
+                return entry.body
+            if stale is not None and entry.is_fresh(stale.max_age):
+                stale.append((url, resource, entry))
+                return entry.body
+        with self.cache.lock(url):
+            return self.__download(url, resource)
+
+    @contextmanager
+    def serve_stale(self):
+        """
+        Within this context, expired cached responses no older than settings
+        allow are used as they are, rather than revalidated. This only applies
+        to loads by the calling thread, and the workers it reads pages with.
+        :return: A context manager, which gives a list of the (url, resource,
+        cache entry) of each expired response used, to be refreshed later
+        """
+        stale = self.__serving.stale = StaleResponses(
+            get_setting_as_int(MAX_STALE) * 60 * 60)
+        try:
+            yield stale
+        finally:
+            self.__serving.stale = None
+
+    def __get_stale(self):
+        return getattr(self.__serving, 'stale', None)
+
+    def refresh(self, url, resource, entry, cancelled):
+        """
+        Revalidate an expired cached response, e.g., one served stale
+        :param url: The URL of the resource
+        :param resource: The type of resource
+        :param entry: The CacheEntry which was served
+        :param cancelled: Event which is set to stop loading
+        :return: True if the content has changed
+        """
+        if cancelled.is_set():
+            return False
+        digest = hashlib.sha1(entry.body.encode('utf-8')).digest()
+        with self.cache.lock(url):
+            body = self.__download(url, resource)
+        return hashlib.sha1(body.encode('utf-8')).digest() != digest
+
+    def __download(self, url, resource):
+        entry, response = self.__request(url, resource)
+        if response is None:
+            return entry.body
+        if resource in CACHE_TTL:
+            self.cache.put(url, response.text, response.headers.get('ETag'),
+                           response.headers.get('Last-Modified'))
+        return response.text
+
+    def __fetch_stream(self, url, resource):
+        """
+        Read the body of a resource in chunks as it downloads, saving it to the
+        response cache along the way
+        :return: A generator of text chunks
+        """
+        entry, response = self.__request(url, resource, stream=True)
+        if response is None:
+            return entry.iter_body()
+        # JSON is UTF-8 unless the server says otherwise
+        response.encoding = response.encoding or 'utf-8'
+        chunks = response.iter_content(STREAM_CHUNK_SIZE, decode_unicode=True)
+        if resource not in CACHE_TTL:
+            return chunks
+        return self.cache.put_stream(url, chunks, response.headers.get('ETag'),
+                                     response.headers.get('Last-Modified'))
+
+    def __request(self, url, resource, stream=False):
+        """
+        Request a resource, unless the cached copy is fresh. Any cached copy is
+        revalidated with the server.
+        :return: The cache entry (if any), and the response; the response is
+        None if the cache entry should be used
+        """
+        ttl = get_cache_ttl(resource)
+        entry = self.cache.get(url) if ttl is not None else None
+        if entry is not None and not self.revalidate and entry.is_fresh(ttl):
+            return entry, None
+        headers = entry.get_validators() if entry is not None else {}
+        response = self.transport.get(url, retries=RETRIES.get(resource),
+                                      headers=headers, stream=stream)
+        if response.status_code == 304 and entry is not None:
+            # Not modified; our copy is good for another TTL
+            response.close()
+            self.cache.touch(entry)
+            return entry, None
+        response.raise_for_status()
+        return entry, response
+
+    def prefetch_pages(self, url, resource, depth, cancelled):
+        """
+        Load pages into the response cache, following their "next" links
+        :param url: The URL of the first page
+        :param resource: The type of resource
+        :param depth: The max. number of pages to load
+        :param cancelled: Event which is set to stop loading
+        :return: None
+        """
+        # The URL the listing will request, so the cached page is used
+        url = get_page_url(url)
+        while url is not None and depth > 0 and not cancelled.is_set():
+            next_link = self.__get_next_link(self.__load(url, resource))
+            url = next_link['href'] if next_link is not None else None
+            depth -= 1
+
+    def get_pages(self, url, resource, get_items, root=None):
+        """
+        Read a page of a resource, plus as many following pages as settings
+        say to show in one listing. The following pages are requested
+        concurrently when their URLs can be derived from the first "next" link.
+        :param url: The URL of the first page; if None, the root link is used
+        :param resource: The type of resource
+        :param get_items: Function which returns the items of a page's JSON
+        :param root: The name of the root link for the resource
+        :return: The items of all pages read, and the "next" link of the last
+        """
+        if url is not None:
+            data = self.get_json(get_page_url(url), resource)
+        else:
+            data = self.get_root_json(root, resource, paged=True)
+        if data is None:
+            return [], None
+        items = list(get_items(data))
+        next_link = self.__get_next_link(data)
+        count = get_setting_as_int(PAGES_PER_LISTING) - 1
+        if next_link is None or count <= 0:
+            return items, next_link
+        for data in self.__read_pages(next_link['href'], resource, count):
+            items.extend(get_items(data))
+            next_link = self.__get_next_link(data)
+            if next_link is None:
+                break
+        return items, next_link
+
+    def __read_pages(self, url, resource, count):
+        """
+        Read up to count consecutive pages, starting at url
+        :return: A generator of the JSON data of each page, in order
+        """
+        urls = get_page_urls(url, count)
+        if urls is None:
+            # Page numbers unknown; follow the links one at a time
+            while url is not None and count > 0:
+                data = self.__read_page(url, resource)
+                if data is None:
+                    return
+                yield data
+                next_link = self.__get_next_link(data)
+                url = next_link['href'] if next_link is not None else None
+                count -= 1
+            return
+        # The workers serve stale responses if this thread does
+        stale = self.__get_stale()
+        with ThreadPoolExecutor(min(count, MAX_PAGE_WORKERS)) as executor:
+            for data in executor.map(
+                    lambda page_url: self.__read_page(page_url, resource, stale), urls):
+                if data is None:
+                    return
+                yield data
+
+    def __read_page(self, url, resource, stale=None):
+        try:
+            return self.__load(url, resource, stale)
+        except Exception as err:
+            # The pages read so far are still shown
+            logger.warning('Could not read page at %s: %s', url, err)
+            return None
+
+    def prune(self):
+        """
+        Remove responses from the cache which are long expired, or the oldest
+        ones if it has grown too big, and data from the local store which the
+        server hasn't returned for a long time
+        :return: None
+        """
+        # Responses which may still be served stale are kept
+        self.cache.prune(max(max(CACHE_TTL.values()) + CACHE_KEEP,
+                             get_setting_as_int(MAX_STALE) * 60 * 60))
+        self.store.prune(STORE_KEEP)
+
     def get_roots(self):
         """
-        Gets root elements from remote server
+        Gets root elements from remote server. These are kept for the life of
+        this Server, and in the response cache (keyed by server address) between
+        invocations.
+        :return: The root links; empty if they could not be read
         :rtype: dict
         """
         # Load root data once
-        root_json = self.get_json(self.url + "/")
-        return root_json['_links']
+        if self.roots is None:
+            root_json = self.get_json(self.__get_roots_url(), ROOTS)
+            if root_json is None:
+                # Try again when next needed
+                return {}
+            self.roots = root_json['_links']
+        return self.roots
 
-    def get_all_events(self, url=None):
+    def invalidate_roots(self):
+        """
+        Discard the roots document, so it is reloaded from the server when next
+        needed
+        :return: None
+        """
+        self.roots = None
+        self.cache.invalidate(self.__get_roots_url())
+
+    def __get_roots_url(self):
+        return self.url + "/"
+
+    def get_all_events(self, url=None, stream=False):
         """
         Retrieves all latest Events from remote data server
+        :param url: The URL of a page of Events; the latest Events if None
+        :param stream: Decode Events while the page downloads
         :return: A list of Event objects
         """
-        # Get events URL
-        events_url = url if url is not None else self.get_roots().get("events")[
-            'href']
+        if stream:
+            if url is None:
+                roots = self.get_roots()
+                if not roots:
+                    return {"events": [], "next": None}
+                url = roots["events"]['href']
+            return self.__stream_events(get_page_url(url))
         # Read Events data
-        events_json = self.get_json(events_url)
-        if '_embedded' in events_json:
-            data = events_json['_embedded']['matches']
-        else:
-            data = events_json['matches']
+        data, next_link = self.get_pages(url, EVENTS, get_event_items, "events")
         # Map to Event objects & return
         return {
-            "events": list(map(Event.create_event, data)),
-            "next": self.__get_next_link(events_json)
+            "events": self.__create_events(data),
+            "next": next_link
         }
 
     def get_all_competitions(self):
@@ -188,11 +517,12 @@ class Server:
         Retrieve all competition_id data from remote server
         :return:
         """
-        # Get link to competition data
-        competition_url = self.get_roots().get("competitions")['href']
         # Read competition data
-        competition_json = self.get_json(competition_url)['_embedded'][
-            'competitions']
+        competition_json = self.get_root_json("competitions", COMPETITIONS)
+        if competition_json is None:
+            return []
+        competition_json = competition_json['_embedded']['competitions']
+        self.store.save_competitions(competition_json, ALL_COMPETITIONS)
         # Map to competition objects & return
         return list(map(Competition.create_competition, competition_json))
 
@@ -201,46 +531,38 @@ class Server:
         Retrieves all teams from remote server
         :return: A list of teams
         """
-        # Get team data url
-        teams_url = url if url is not None else self.get_roots().get("teams")[
-            'href']
         # Read teams data
-        team_json = self.get_json(teams_url)
+        data, next_link = self.get_pages(url, TEAMS, get_team_items, "teams")
         # Map to Team object & return
         return {
-            "teams": list(
-                map(Team.create_team, team_json['_embedded']['teams'])),
-            "next": self.__get_next_link(team_json)
+            "teams": self.__create_teams(data),
+            "next": next_link
         }
 
-    def get_teams_by_competition(self, competition):
+    def get_teams_by_competition(self, data_url):
         """
-        Retrieves all Teams competing in the specified competition_id
-        :param competition: The competition_id for which we want Teams
+        Retrieves all Teams competing in a Competition
+        :param data_url: The URL of the Competition's Teams
         :return: A list of Teams in this competition_id
         """
-        # Get URL of teams data
-        data_url = competition.links['teams']['href']
         # Read data from server
-        teams_json = self.get_json(data_url)['_embedded']['teams']
+        data, next_link = self.get_pages(data_url, TEAMS, get_team_items)
         return {
-            "teams": list(map(Team.create_team, teams_json)),
-            "next": None,
+            "teams": self.__create_teams(data),
+            "next": next_link,
         }
 
-    def get_events_by_competition(self, competition):
+    def get_events_by_competition(self, data_url):
         """
-        Retrieves paged Events for the specified competition_id from the server
-        :param competition: The competition_id for which we want events
+        Retrieves paged Events for a Competition from the server
+        :param data_url: The URL of the Competition's Events
         :return: A list of Events in this competition_id
         """
-        # Competition data url
-        data_url = competition.links['events']['href']
         # Get data from server
-        comp_event_data = self.get_json(data_url)
+        data, next_link = self.get_pages(data_url, EVENTS, get_event_items)
         return {
-            "events": list(map(Event.create_event, comp_event_data['matches'])),
-            "next": self.__get_next_link(comp_event_data)
+            "events": self.__create_events(data),
+            "next": next_link
         }
 
     def get_events_by_team(self, team):
@@ -250,15 +572,13 @@ class Server:
         :param: team: The Team for which Events are desired
         :return: A list of Events
         """
-        xbmc.log(f'Getting Events for Team: {team}', xbmc.LOGINFO)
+        logger.debug('Getting Events for Team: %s', team)
         data_url = team.links['events']['href']
         # Read team Events from server
-        event_data = self.get_json(data_url)
-        next_url = self.__get_next_link(event_data)
+        data, next_link = self.get_pages(data_url, EVENTS, get_event_items)
         return {
-            "events": list(
-                map(Event.create_event, event_data['_embedded']['matches'])),
-            "next": next_url
+            "events": self.__create_events(data),
+            "next": next_link
         }
 
     def get_video_source_list(self, url):
@@ -268,10 +588,230 @@ class Server:
         :return: A JSON object of the playlist resource
         """
         # Fetch the playlist resource
-        return self.get_json(url)
+        return self.get_json(url, VIDEO_SOURCES)
+
+    def get_video_source(self, url):
+        """
+        Retrieve a single video source (the URIs to play) from remote server
+        :param url: The URL of the video source
+        :return: A JSON object of the video source
+        """
+        return self.get_json(url, VIDEO_SOURCE)
+
+    def probe_video_source(self, url, timeout):
+        """
+        Measure how quickly the host of a video source responds. The video
+        source is loaded into the response cache along the way, so it plays
+        without another request if chosen.
+        :param url: The URL of the video source
+        :param timeout: Max. seconds to wait for each response
+        :return: Seconds until the host of the first URI responded
+        :raises: Exception if the video source or its host is unavailable
+        """
+        source_json = self.__load(url, VIDEO_SOURCE)
+        uri = source_json['uris'][0]['uri']
+        # Only the headers are read
+        with self.transport.get(uri, retries=0, deadline=timeout, stream=True,
+                                timeout=timeout) as response:
+            response.raise_for_status()
+            return response.elapsed.total_seconds()
+
+    def prefetch_video_source(self, url, preferred_url, cancelled, get_source_url=None):
+        """
+        Load the video source list & preferred video source of an Event into
+        the response cache, so playback starts without waiting on the server
+        :param url: The URL of the video source list
+        :param preferred_url: The URL of the preferred video source, if known
+        :param cancelled: Event which is set to stop loading
+        :param get_source_url: Function which chooses the video source to load
+        from the list's JSON, if not the preferred one
+        :return: None
+        """
+        if preferred_url is None or get_source_url is not None:
+            source_json = self.__load(url, VIDEO_SOURCES)
+            preferred_url = get_source_url(source_json) if get_source_url is not None \
+                else source_json['_links']['preferred']['href']
+        if not cancelled.is_set():
+            self.__load(preferred_url, VIDEO_SOURCE)
+
+    def __stream_events(self, url):
+        """
+        Decode a page of Events one at a time, as it is read from the server
+        (or response cache), so the page is never held in memory whole
+        :param url: The URL of the page
+        :return: An EventStream
+        """
+        def read_chunks():
+            # Deferred until the first Event is read, so errors are handled below
+            yield from self.__fetch_stream(url, EVENTS)
+
+        array = JsonArrayStream(read_chunks(), 'matches')
+
+        def read_events():
+            batch = []
+            try:
+                for event_data in array:
+                    batch.append(event_data)
+                    if len(batch) == STREAM_STORE_BATCH:
+                        self.store.save_events(batch)
+                        batch = []
+                    yield Event.create_event(event_data)
+            except Exception as err:
+                self.__notify_error(url, err)
+            finally:
+                if batch:
+                    self.store.save_events(batch)
+
+        return EventStream(read_events(),
+                           lambda: self.__get_next_link(array.envelope or {}))
+
+    def __create_events(self, data):
+        self.store.save_events(data)
+        return list(map(Event.create_event, data))
+
+    def __create_teams(self, data):
+        self.store.save_teams(data)
+        return list(map(Team.create_team, data))
 
     @staticmethod
     def __get_next_link(data):
         if '_links' in data:
             if 'next' in data['_links']:
                 return data['_links']['next']
+
+
+class StaleResponses(list):
+    """
+    The (url, resource, cache entry) of each expired response served, while
+    serving stale responses
+    """
+
+    def __init__(self, max_age):
+        """
+        :param max_age: The max. age of a response served, in seconds
+        """
+        super().__init__()
+        self.max_age = max_age
+
+
+class EventStream:
+    """
+    A page of Events which are decoded as they are iterated. Like the page
+    dicts returned by Server, it has "events" & "next" items; reading "next"
+    finishes reading the Events.
+    """
+
+    def __init__(self, events, get_next):
+        self.events = events
+        self.get_next = get_next
+
+    def __getitem__(self, key):
+        if key == 'events':
+            return self.events
+        if key == 'next':
+            # Next link follows the Events in the page
+            for _ in self.events:
+                pass
+            return self.get_next()
+        raise KeyError(key)
+
+
+def get_cache_ttl(resource):
+    """
+    Get how long a type of resource may be served from the response cache
+    :param resource: The type of resource
+    :return: The TTL in seconds, or None if the resource is not cached
+    """
+    if resource in (VIDEO_SOURCES, VIDEO_SOURCE):
+        # Stream links may expire, so this is kept short & configurable
+        ttl = get_setting_as_int(VIDEO_CACHE_TTL)
+        if ttl > 0:
+            return ttl
+    return CACHE_TTL.get(resource)
+
+
+def get_event_items(data):
+    """
+    :param data: The JSON data of a page of Events
+    :return: The Events on the page
+    """
+    # Competition pages list their Events at the top level
+    return data.get('_embedded', data).get('matches', [])
+
+
+def get_team_items(data):
+    """
+    :param data: The JSON data of a page of Teams
+    :return: The Teams on the page
+    """
+    return data.get('_embedded', {}).get('teams', [])
+
+
+def set_query_param(url, name, value):
+    """
+    Set a query parameter of a URL, replacing any existing value
+    :return: The new URL
+    """
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    # Keep the order of parameters, so URLs match the server's own links
+    names = [key for key, _ in query]
+    if name in names:
+        query[names.index(name)] = (name, str(value))
+    else:
+        query.append((name, str(value)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def get_page_url(url):
+    """
+    Request the page size chosen in settings (if any) from a paged resource.
+    Links which already specify a size are left as they are, so the pages of
+    a listing stay aligned.
+    :param url: The URL of a page
+    :return: The URL to request
+    """
+    size = get_setting_as_int(PAGE_SIZE)
+    if size <= 0 or 'size' in dict(parse_qsl(urlsplit(url).query)):
+        return url
+    return set_query_param(url, 'size', size)
+
+
+def get_page_urls(url, count):
+    """
+    Derive the URLs of consecutive pages from the URL of the first one
+    :param url: The URL of a page, with a "page" number query parameter
+    :param count: The number of pages
+    :return: A list of URLs, or None if url has no page number
+    """
+    try:
+        first = int(dict(parse_qsl(urlsplit(url).query))['page'])
+    except (KeyError, ValueError):
+        return None
+    return [url] + [set_query_param(url, 'page', page)
+                    for page in range(first + 1, first + count)]
+
+
+def get_server_url():
+    """
+    Read the server address from settings, fixing it if it lacks a scheme
+    :return: The server URL
+    """
+    address = get_setting(SERVER_ADDRESS)
+    if not re.match("^https?://", address):
+        address = 'http://' + address
+        # fix setting
+        set_setting(SERVER_ADDRESS, address)
+    return address
+
+
+def get_server():
+    """
+    Get the Server shared by all repositories. A new Server is created if the
+    server address setting has changed.
+    :return: The Server instance
+    """
+    global _server
+    if _server is None or _server.url != get_server_url():
+        _server = Server()
+    return _server
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Local SQLite store of Event, Team & Competition metadata.
+"""
+
+#  Copyright (c) 2024
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from resources.lib.kodiutils import get_profile_path
+
+STORE_FILE = 'metadata-{}.db'
+# Increased when the schema changes; a store with another version is replaced
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS competitions (
+    comp_id TEXT PRIMARY KEY,
+    name TEXT,
+    saved REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS teams (
+    team_id TEXT PRIMARY KEY,
+    name TEXT,
+    saved REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    event_id TEXT PRIMARY KEY,
+    date TEXT,
+    comp_id TEXT,
+    home_team_id TEXT,
+    away_team_id TEXT,
+    saved REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_by_date ON events (date);
+CREATE INDEX IF NOT EXISTS events_by_competition ON events (comp_id, date);
+CREATE INDEX IF NOT EXISTS events_by_home_team ON events (home_team_id, date);
+CREATE INDEX IF NOT EXISTS events_by_away_team ON events (away_team_id, date);
+CREATE TABLE IF NOT EXISTS collections (
+    name TEXT PRIMARY KEY,
+    updated REAL NOT NULL
+);
+"""
+TABLES = ('competitions', 'teams', 'events', 'collections')
+# Names of complete collections, for which the store records when they were
+# last loaded from the server
+ALL_COMPETITIONS = 'competitions'
+
+_store = None
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataStore:
+    """
+    Holds the JSON data of Events, Teams & Competitions, indexed for lookup by
+    ID and for client-side paging & sorting of Events. Data is saved on a
+    background thread, so listings don't wait for it.
+    """
+
+    def __init__(self, server_url, path=None):
+        if path is None:
+            key = hashlib.sha1(server_url.encode('utf-8')).hexdigest()[:12]
+            path = os.path.join(get_profile_path(), STORE_FILE.format(key))
+        self.server_url = server_url
+        self.connection = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self.__create_schema()
+        self.__lock = threading.Lock()
+        # One writer, so changes are applied in the order they are made
+        self.__writer = ThreadPoolExecutor(max_workers=1)
+
+    def save_competitions(self, competitions, collection=None):
+        """
+        Add or update Competitions
+        :param competitions: A list of Competition JSON data
+        :param collection: If this is a complete collection, its name
+        :return: None
+        """
+        saved = time.time()
+        self.__writer.submit(
+            self.__save, "INSERT OR REPLACE INTO competitions VALUES (?, ?, ?, ?)",
+            lambda: [(comp['id'], comp['name']['name'], saved, json.dumps(comp))
+                     for comp in competitions], collection)
+
+    def save_teams(self, teams):
+        """
+        Add or update Teams
+        :param teams: A list of Team JSON data
+        :return: None
+        """
+        saved = time.time()
+        self.__writer.submit(
+            self.__save, "INSERT OR REPLACE INTO teams VALUES (?, ?, ?, ?)",
+            lambda: [(team['id'], team['name']['name'], saved, json.dumps(team))
+                     for team in teams])
+
+    def save_events(self, events):
+        """
+        Add or update Events
+        :param events: A list of Event JSON data
+        :return: None
+        """
+        saved = time.time()
+        self.__writer.submit(
+            self.__save, "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?)",
+            lambda: [get_event_row(event, saved) for event in events])
+
+    def is_fresh(self, collection, ttl):
+        """
+        Determine if a complete collection was loaded recently
+        :param collection: The name of the collection
+        :param ttl: The maximum age of the collection, in seconds
+        :return: True if the collection is younger than ttl
+        """
+        row = self.__query_one("SELECT updated FROM collections WHERE name = ?",
+                               (collection,))
+        return row is not None and time.time() - row[0] < ttl
+
+    def expire(self):
+        """
+        Mark all complete collections as out of date, so they are loaded from
+        the server when next needed
+        :return: None
+        """
+        self.__writer.submit(self.__save, "DELETE FROM collections", lambda: [()])
+
+    def prune(self, max_age):
+        """
+        Remove Events, Teams & Competitions which have not been saved again,
+        i.e. seen in a server response, for max_age seconds
+        :param max_age: Max. age of a row, in seconds
+        :return: None
+        """
+        oldest = time.time() - max_age
+        for table in TABLES[:3]:
+            self.__writer.submit(self.__save, f"DELETE FROM {table} WHERE saved < ?",
+                                 lambda: [(oldest,)])
+
+    def get_competitions(self):
+        """
+        :return: JSON data of all stored Competitions, sorted by name
+        """
+        return self.__query_data("SELECT data FROM competitions ORDER BY name")
+
+    def get_competition(self, comp_id):
+        """
+        :param comp_id: The ID of the Competition
+        :return: The Competition JSON data, or None if not stored
+        """
+        return self.__query_data_one("SELECT data FROM competitions WHERE comp_id = ?",
+                                     (comp_id,))
+
+    def get_team(self, team_id):
+        """
+        :param team_id: The ID of the Team
+        :return: The Team JSON data, or None if not stored
+        """
+        return self.__query_data_one("SELECT data FROM teams WHERE team_id = ?",
+                                     (team_id,))
+
+    def get_events(self, comp_id=None, team_id=None, limit=-1, offset=0,
+                   descending=True):
+        """
+        Page through stored Events, sorted by date
+        :param comp_id: Only include Events in this Competition
+        :param team_id: Only include Events in which this Team plays
+        :param limit: The maximum number of Events; -1 for all
+        :param offset: The number of Events to skip
+        :param descending: Sort latest Events first
+        :return: A list of Event JSON data
+        """
+        clauses, params = [], []
+        if comp_id is not None:
+            clauses.append("comp_id = ?")
+            params.append(comp_id)
+        if team_id is not None:
+            clauses.append("(home_team_id = ? OR away_team_id = ?)")
+            params.extend((team_id, team_id))
+        query = "SELECT data FROM events"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY date {} LIMIT ? OFFSET ?".format(
+            "DESC" if descending else "ASC")
+        return self.__query_data(query, params + [limit, offset])
+
+    def __create_schema(self):
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            # The store only holds copies of server data, so it is rebuilt
+            self.connection.executescript("".join(
+                f"DROP TABLE IF EXISTS {table};" for table in TABLES))
+        self.connection.executescript(SCHEMA)
+        self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def __save(self, statement, get_rows, collection=None):
+        try:
+            rows = get_rows()
+            with self.__lock, self.connection:
+                self.connection.executemany(statement, rows)
+                if collection is not None:
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO collections VALUES (?, ?)",
+                        (collection, time.time()))
+        except sqlite3.Error as err:
+            logger.warning("Could not update metadata store: %s", err)
+
+    def __query_one(self, query, params):
+        try:
+            with self.__lock:
+                return self.connection.execute(query, params).fetchone()
+        except sqlite3.Error as err:
+            logger.warning("Could not read metadata store: %s", err)
+            return None
+
+    def __query_data_one(self, query, params):
+        row = self.__query_one(query, params)
+        return json.loads(row[0]) if row is not None else None
+
+    def __query_data(self, query, params=()):
+        try:
+            with self.__lock:
+                rows = self.connection.execute(query, params).fetchall()
+        except sqlite3.Error as err:
+            logger.warning("Could not read metadata store: %s", err)
+            return []
+        return [json.loads(row[0]) for row in rows]
+
+
+def get_event_row(event, saved):
+    """
+    :param event: Event JSON data
+    :param saved: When the Event was saved
+    :return: The row of the events table for the Event
+    """
+    home_team = event.get('homeTeam') or {}
+    away_team = event.get('awayTeam') or {}
+    competition = event.get('competition') or {}
+    return (event.get('eventId'), event.get('date'), competition.get('id'),
+            home_team.get('id'), away_team.get('id'), saved, json.dumps(event))
+
+
+def get_store(server_url):
+    """
+    Get the metadata store for a server. Each server has its own store.
+    :param server_url: The URL of the server
+    :return: The MetadataStore instance
+    """
+    global _store
+    if _store is None or _store.server_url != server_url:
+        _store = MetadataStore(server_url)
+    return _store
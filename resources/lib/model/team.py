@@ -45,10 +45,14 @@ Football team
 #  You should have received a copy of the GNU General Public License
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+from resources.lib.model.identity_map import IDENTITY_MAP, merge_links
+
+
 class Team:
     """
     Represents a football team
     """
+    __slots__ = ('team_id', 'name', 'links')
 
     def __init__(self, team_id, name, links):
         self.team_id = team_id
@@ -58,11 +62,17 @@ class Team:
     @staticmethod
     def create_team(team_data):
         """
-        Factory method to create a Team object from a JSON string
+        Factory method to create a Team object from a JSON string. Each Team is
+        built only once per invocation.
         :param team_data: JSON data representing a team
         :return: The Team object
         """
-        return Team(team_data['id'], team_data['name']['name'], team_data['_links'])
+        team_id = team_data['id']
+        team = IDENTITY_MAP.get(Team, team_id)
+        if team is not None:
+            return merge_links(team, team_data['_links'])
+        return IDENTITY_MAP.put(Team, team_id, Team(
+            team_id, team_data['name']['name'], team_data['_links']))
 
     def __str__(self):
         return self.name
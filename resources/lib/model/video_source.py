@@ -83,7 +83,51 @@ Represents a single Video stream resource
 #  You should have received a copy of the GNU General Public License
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import re
+
+# Frame heights of resolutions given by name
+NAMED_RESOLUTIONS = {
+    'sd': 480,
+    'hd': 720,
+    'fhd': 1080,
+    'fullhd': 1080,
+    'qhd': 1440,
+    '2k': 1440,
+    'uhd': 2160,
+    '4k': 2160,
+    '8k': 4320,
+}
+# Bitrate units, relative to Mbps
+BITRATE_UNITS = {
+    'bps': 0.000001,
+    'kbps': 0.001,
+    'kb/s': 0.001,
+    'k': 0.001,
+    'mbps': 1,
+    'mb/s': 1,
+    'm': 1,
+    'gbps': 1000,
+}
+# Video codecs by their common aliases
+CODEC_ALIASES = {
+    'avc': 'h264',
+    'avc1': 'h264',
+    'x264': 'h264',
+    'h.264': 'h264',
+    'hevc': 'h265',
+    'hvc1': 'h265',
+    'hev1': 'h265',
+    'x265': 'h265',
+    'h.265': 'h265',
+    'av01': 'av1',
+}
+NUMBER = re.compile(r'\d+(?:\.\d+)?')
+
+
 class VideoSource:
+    __slots__ = ('channel', 'source', 'languages', 'resolution', 'media_container',
+                 'bitrate', 'framerate', 'video_codec', 'audio_codec', 'stream_url',
+                 'latency', 'available')
 
     def __init__(self, resource):
         self.channel = resource['channel'] if 'channel' in resource else ''
@@ -96,11 +140,89 @@ class VideoSource:
         self.video_codec = resource['videoCodec'] if 'videoCodec' in resource else ''
         self.audio_codec = resource['audioCodec'] if 'audioCodec' in resource else ''
         self.stream_url = resource['_links']['stream']['href'] if '_links' in resource else ''
+        # Results of probing the stream host; None until probed
+        self.latency = None
+        self.available = None
 
     def __str__(self):
         return "{} ({}, {}/{}fps, {}Mbps)".format(self.channel, self.languages, self.resolution, self.framerate,
                                                   self.bitrate)
 
+    @property
+    def height(self):
+        """
+        :return: The frame height in pixels, e.g. 1080 for "1080p" or
+        "1920x1080"; 0 if unknown
+        """
+        return parse_resolution(self.resolution)
+
+    @property
+    def bitrate_mbps(self):
+        """
+        :return: The video bitrate in Mbps; 0 if unknown
+        """
+        return parse_bitrate(self.bitrate)
+
+    @property
+    def frames_per_second(self):
+        """
+        :return: The frame rate; 0 if unknown
+        """
+        return parse_number(self.framerate)
+
+    @property
+    def codec(self):
+        """
+        :return: The normalized video codec name, e.g. "h264"; '' if unknown
+        """
+        return parse_codec(self.video_codec)
+
     @staticmethod
     def parse_video_resource(resource):
         return VideoSource(resource)
+
+
+def parse_number(value):
+    """
+    Read the first number in a value, which may be a number or a string
+    :return: The number as a float, or 0 if there is none
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = NUMBER.search(str(value))
+    return float(match.group()) if match else 0
+
+
+def parse_resolution(resolution):
+    """
+    Read the frame height from a resolution, e.g. "720p", "1280x720" or "4K"
+    :return: The height in pixels, or 0 if unknown
+    """
+    text = str(resolution).strip().lower().replace(' ', '')
+    if text in NAMED_RESOLUTIONS:
+        return NAMED_RESOLUTIONS[text]
+    if 'x' in text:
+        # Width x height
+        return int(parse_number(text.split('x', 1)[1]))
+    return int(parse_number(text))
+
+
+def parse_bitrate(bitrate):
+    """
+    Read a bitrate, e.g. 8, "8 Mbps" or "8000kbps". Plain numbers are in Mbps.
+    :return: The bitrate in Mbps, or 0 if unknown
+    """
+    value = parse_number(bitrate)
+    unit = NUMBER.sub('', str(bitrate)).strip().lower()
+    return value * BITRATE_UNITS.get(unit, 1)
+
+
+def parse_codec(codec):
+    """
+    Normalize the name of a video codec, e.g. "AVC" or "H.264" to "h264"
+    :return: The codec name, or '' if unknown
+    """
+    name = str(codec).strip().lower()
+    # Drop any profile, e.g. "avc1.640028"
+    name = name.split('.', 1)[0] if not name.startswith('h.') else name
+    return CODEC_ALIASES.get(name, name.replace('.', ''))
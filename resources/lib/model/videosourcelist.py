@@ -83,14 +83,22 @@ Represents video playlist set - master playlist + variant playlists.
 #  You should have received a copy of the GNU General Public License
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-import json
-from urllib.error import HTTPError
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from operator import attrgetter
 
-import requests
-import xbmc
+from resources.lib.model.server import get_server
+from resources.lib.model.video_source import VideoSource, parse_codec
 
-from resources.lib.kodiutils import notification
-from resources.lib.model.video_source import VideoSource
+# Max. seconds to wait for stream hosts to respond when probing variants
+PROBE_DEADLINE = 3
+# Max. variants probed at once
+MAX_PROBE_WORKERS = 4
+# Share of the estimated throughput a variant's bitrate may use, leaving
+# headroom for audio, overhead & fluctuations
+BANDWIDTH_HEADROOM = 0.8
+
+logger = logging.getLogger(__name__)
 
 
 class VideoSourceList:
@@ -111,13 +119,34 @@ class VideoSourceList:
         variant_count = len(self.variants)
         return "Video VideoSourceList (variants: {})".format(variant_count)
 
-    def get_preferred_source(self):
+    def get_preferred_source(self, bandwidth=None, language='', codec=''):
         """
-        Gets the highest-quality and/or most relevant variant video source.
+        Gets the highest-quality and/or most relevant variant video source. If
+        the client's throughput is known, the best variant which fits it is
+        chosen; otherwise, the server's preferred variant.
+        :param bandwidth: The estimated throughput in Mbps, if known
+        :param language: Preferred language; '' for any
+        :param codec: Preferred video codec; '' for any
         :return: The "best" variant
         """
-        url = self.preferred_playlist_url
-        return self.download_video_source(url)
+        return self.download_video_source(
+            self.get_preferred_url(bandwidth, language, codec))
+
+    def get_preferred_url(self, bandwidth=None, language='', codec=''):
+        """
+        Gets the URL of the variant video source get_preferred_source() would
+        download
+        :param bandwidth: The estimated throughput in Mbps, if known
+        :param language: Preferred language; '' for any
+        :param codec: Preferred video codec; '' for any
+        :return: The URL of the video source
+        """
+        if bandwidth is not None:
+            variant = self.choose_variant(bandwidth, language, codec)
+            if variant is not None:
+                logger.debug("Chose %s for %.1f Mbps", variant, bandwidth)
+                return variant.stream_url
+        return self.preferred_playlist_url
 
     def get_variant_source(self, idx=0):
         """
@@ -127,6 +156,65 @@ class VideoSourceList:
         selected_source = self.variants[idx]
         return self.download_video_source(selected_source.stream_url)
 
+    def probe_variants(self, deadline=PROBE_DEADLINE):
+        """
+        Probe the stream host of each variant concurrently, then order the
+        variants by how quickly their hosts responded. Variants which did not
+        respond by the deadline follow, then those which are unavailable.
+        :param deadline: Max. seconds to wait for all probes
+        :return: None
+        """
+        if not self.variants:
+            return
+        server = get_server()
+        executor = ThreadPoolExecutor(min(len(self.variants), MAX_PROBE_WORKERS))
+        futures = {executor.submit(server.probe_video_source, variant.stream_url,
+                                   deadline): variant for variant in self.variants}
+        done, _ = wait(futures, timeout=deadline)
+        # Don't wait for slow hosts
+        executor.shutdown(wait=False)
+        for future in done:
+            variant = futures[future]
+            try:
+                variant.latency = future.result()
+                variant.available = True
+            except Exception as err:
+                logger.debug("Variant %s is unavailable: %s", variant, err)
+                variant.available = False
+        self.variants.sort(key=self.sort_probed_variants)
+
+    def choose_variant(self, bandwidth, language='', codec=''):
+        """
+        Choose the best variant the client can play without rebuffering
+        :param bandwidth: The estimated throughput, in Mbps
+        :param language: Preferred language; '' for any
+        :param codec: Preferred video codec, e.g. "h264"; '' for any
+        :return: The chosen VideoSource, or None if there are no variants
+        """
+        candidates = self.variants
+        if language:
+            candidates = [variant for variant in candidates
+                          if language.lower() in str(variant.languages).lower()] \
+                or candidates
+        if codec:
+            codec = parse_codec(codec)
+            candidates = [variant for variant in candidates if variant.codec == codec] \
+                or candidates
+        if not candidates:
+            return None
+        budget = bandwidth * BANDWIDTH_HEADROOM
+        fitting = [variant for variant in candidates if variant.bitrate_mbps <= budget]
+        if not fitting:
+            # Nothing fits; the least demanding variant stalls least
+            return min(candidates, key=attrgetter('bitrate_mbps'))
+        return max(fitting, key=self.sort_playlist_variants)
+
+    @staticmethod
+    def sort_probed_variants(source):
+        if source.available:
+            return 0, source.latency
+        return (1 if source.available is None else 2), 0
+
     @staticmethod
     def create_video_source_list(source_data):
         """
@@ -139,19 +227,13 @@ class VideoSourceList:
 
     @staticmethod
     def sort_playlist_variants(source):
-        return source.resolution
+        return source.height, source.frames_per_second, source.bitrate_mbps
 
     @staticmethod
     def download_video_source(url):
         """
         Fetch a video source from the server
         """
-        try:
-            response = requests.get(url)
-            video_source = json.loads(response.text)
-            xbmc.log("Got VideoPlaylist resource: {}".format(video_source), xbmc.LOGINFO)
-            return video_source
-        except HTTPError as http_error:
-            notification("Could not retrieve playlist", f'Location: {url} \n {http_error}')
-        except Exception as err:
-            notification("Error", f'Error getting playlist from {url}: {err}')
+        video_source = get_server().get_video_source(url)
+        logger.debug("Got VideoPlaylist resource: %s", video_source)
+        return video_source
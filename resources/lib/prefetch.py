@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Background fetching of resources the user is likely to open next.
+"""
+
+#  Copyright (c) 2024
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Max. background fetches at once
+MAX_WORKERS = 2
+
+_prefetcher = None
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """
+    Runs fetch tasks on background threads. Tasks receive a cancellation flag.
+    An invocation doesn't wait for its tasks; they are cancelled when the next
+    invocation starts, as they would compete with its fetches.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        self.max_workers = max_workers
+        self.cancelled = threading.Event()
+        self.executor = None
+        self.futures = []
+        # Cancellation flags & futures of finished invocations' tasks
+        self.finished = []
+
+    def submit(self, task, *args):
+        """
+        Run a task in the background
+        :param task: The function to run; called as task(*args, cancelled)
+        :param args: Arguments for the task
+        :return: None
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self.futures.append(self.executor.submit(self.__run, task, args,
+                                                self.cancelled))
+
+    def finish(self):
+        """
+        End this invocation without waiting for its tasks, which run on until
+        cancel_finished() is called
+        :return: None
+        """
+        if self.executor is None:
+            return
+        self.executor.shutdown(wait=False)
+        self.finished.append((self.cancelled, self.futures))
+        # Ready for the next invocation
+        self.cancelled = threading.Event()
+        self.executor = None
+        self.futures = []
+
+    def cancel_finished(self):
+        """
+        Cancel the tasks of finished invocations. Running tasks stop at their
+        next check of the cancellation flag.
+        :return: None
+        """
+        for cancelled, futures in self.finished:
+            cancelled.set()
+            for future in futures:
+                future.cancel()
+        self.finished = []
+
+    @staticmethod
+    def __run(task, args, cancelled):
+        if cancelled.is_set():
+            return
+        try:
+            task(*args, cancelled)
+        except Exception as err:
+            logger.debug("Background fetch failed: %s", err)
+
+
+def get_prefetcher():
+    """
+    Get the background fetcher for this invocation
+    :return: The Prefetcher instance
+    """
+    global _prefetcher
+    if _prefetcher is None:
+        _prefetcher = Prefetcher()
+    return _prefetcher
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Coalescing of concurrent calls for the same resource.
+"""
+
+#  Copyright (c) 2024
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Runs one call per key at a time. Threads which ask for a key while a call
+    for it is running wait for, and share, its result (or exception).
+    """
+
+    def __init__(self):
+        self.__calls = {}
+        self.__lock = threading.Lock()
+
+    def run(self, key, func, *args):
+        """
+        Call func(*args), unless a call for key is already running
+        :param key: Identifies the call, e.g. a URL
+        :param func: The function to call
+        :param args: Arguments for the function
+        :return: The result of the call
+        """
+        with self.__lock:
+            future = self.__calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.__calls[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = func(*args)
+        except BaseException as err:
+            future.set_exception(err)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.__lock:
+                del self.__calls[key]
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Rolling estimate of this client's download throughput.
+"""
+
+#  Copyright (c) 2024
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import logging
+import os
+import threading
+import time
+
+from resources.lib.kodiutils import get_profile_path
+
+THROUGHPUT_FILE = 'throughput.json'
+# Weight of the newest sample in the moving average
+SMOOTHING = 0.3
+# Smaller downloads take as long as the round trip, whatever the bandwidth
+MIN_SAMPLE_BYTES = 64 * 1024
+# Min. seconds between saves while samples come in; the estimate is also
+# saved when an invocation finishes
+SAVE_INTERVAL = 60
+
+_throughput = None
+
+logger = logging.getLogger(__name__)
+
+
+class ThroughputEstimate:
+    """
+    Exponentially weighted moving average of download throughput, kept in
+    the addon profile so it carries over between invocations
+    """
+
+    def __init__(self, path=None):
+        self.path = path if path is not None else \
+            os.path.join(get_profile_path(), THROUGHPUT_FILE)
+        self.mbps = None
+        self.__lock = threading.Lock()
+        self.__changed = False
+        self.__saved = time.monotonic()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as data_file:
+                self.mbps = json.load(data_file).get('mbps')
+        except (OSError, ValueError):
+            pass
+
+    def add_sample(self, size, seconds):
+        """
+        Update the estimate with a completed download
+        :param size: The number of bytes downloaded
+        :param seconds: How long the download took
+        :return: None
+        """
+        if size < MIN_SAMPLE_BYTES or seconds <= 0:
+            return
+        mbps = size * 8 / seconds / 1000000
+        with self.__lock:
+            if self.mbps is None:
+                self.mbps = mbps
+            else:
+                self.mbps = SMOOTHING * mbps + (1 - SMOOTHING) * self.mbps
+            self.__changed = True
+            if time.monotonic() - self.__saved >= SAVE_INTERVAL:
+                self.__save()
+
+    def get_mbps(self):
+        """
+        :return: The estimated throughput in megabits per second, or None if
+        nothing has been measured yet
+        """
+        return self.mbps
+
+    def save(self):
+        """
+        Save the estimate to the addon profile, if it has changed
+        :return: None
+        """
+        with self.__lock:
+            if self.__changed:
+                self.__save()
+
+    def __save(self):
+        self.__changed = False
+        self.__saved = time.monotonic()
+        tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as out:
+                json.dump({'mbps': self.mbps}, out)
+            os.replace(tmp_path, self.path)
+        except OSError as err:
+            logger.warning("Could not save throughput estimate: %s", err)
+
+
+def get_throughput():
+    """
+    Get the throughput estimate for this client
+    :return: The ThroughputEstimate instance
+    """
+    global _throughput
+    if _throughput is None:
+        _throughput = ThroughputEstimate()
+    return _throughput
+
+
+def save_throughput():
+    """
+    Save the throughput estimate, if one has been used by this process
+    :return: None
+    """
+    if _throughput is not None:
+        _throughput.save()
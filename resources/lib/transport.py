@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP transport: a pooled, keep-alive session used for all requests to
+the remote server.
+"""
+
+#  Copyright (c) 2024
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+import xbmc
+from requests.adapters import HTTPAdapter
+
+from resources.lib.throughput import get_throughput
+
+# (connect, read) timeouts, in seconds
+DEFAULT_TIMEOUT = (5, 30)
+# Max. connections kept alive per host
+DEFAULT_POOL_SIZE = 4
+# Retries after a failed attempt, and max. seconds for all attempts
+DEFAULT_RETRIES = 2
+DEFAULT_DEADLINE = 20
+# Backoff between attempts: a random delay up to base * 2^attempt, capped
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 4
+# Responses which mean the server may succeed if asked again
+RETRY_STATUSES = (429, 502, 503, 504)
+# Consecutive failures after which a host is left alone, and for how long
+FAILURE_THRESHOLD = 5
+COOLDOWN = 30
+
+_transport = None
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """
+    Raised instead of making a request to a host which keeps failing
+    """
+
+
+class CircuitBreaker:
+    """
+    Tracks consecutive failures of a host. After too many, requests to it fail
+    at once until it has had time to recover; then one is let through to try
+    it again. Until that trial request has an outcome, others still fail.
+    """
+
+    def __init__(self, threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened = None
+        self.trial = False
+        self.__lock = threading.Lock()
+
+    def allow(self):
+        """
+        Check whether a request to the host may be made. Once the cooldown is
+        over, the first caller is allowed, as the trial; it must then call
+        record_success(), record_failure() or release().
+        :return: True if a request to the host may be made
+        """
+        with self.__lock:
+            if self.opened is None:
+                return True
+            if self.trial or time.monotonic() - self.opened < self.cooldown:
+                return False
+            self.trial = True
+            return True
+
+    def record_success(self):
+        with self.__lock:
+            self.failures = 0
+            self.opened = None
+            self.trial = False
+
+    def record_failure(self):
+        with self.__lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                # Also after a failed trial, so the cooldown starts again
+                self.opened = time.monotonic()
+            self.trial = False
+
+    def release(self):
+        """
+        End a request which failed for reasons other than the host, so that
+        another may be the trial
+        """
+        with self.__lock:
+            self.trial = False
+
+
+class Transport:
+    """
+    Wraps a pooled requests.Session, so connections are reused across requests
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 throughput=None):
+        """
+        :param pool_size: Max. connections kept alive per host
+        :param timeout: Default (connect, read) timeouts, in seconds
+        :param throughput: A ThroughputEstimate to update with download
+        timings, if any
+        """
+        self.timeout = timeout
+        self.throughput = throughput
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Connection'] = 'keep-alive'
+        self.request_count = 0
+        self.breakers = {}
+        self.__baseline = (0, 0)
+        self.__lock = threading.Lock()
+
+    def get(self, url, retries=None, deadline=None, **kwargs):
+        """
+        Perform a GET request using the shared session. Connection errors,
+        timeouts & temporary server errors are retried after a jittered,
+        exponential backoff, within an overall deadline.
+        :param url: The URL to fetch
+        :param retries: Max. retries after the first attempt
+        :param deadline: Max. seconds for all attempts
+        :param kwargs: Passed to requests.Session.get()
+        :return: The response; the last one, if all attempts failed with a
+        server error
+        :raises: requests.RequestException if no response was received
+        """
+        retries = retries if retries is not None else DEFAULT_RETRIES
+        end = time.monotonic() + (deadline if deadline is not None else DEFAULT_DEADLINE)
+        timeout = kwargs.pop('timeout', self.timeout)
+        host = urlsplit(url).netloc
+        breaker = self.__get_breaker(host)
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                raise CircuitOpenError(f"{host} is not responding; waiting "
+                                       f"{breaker.cooldown}s before trying again")
+            remaining = max(end - time.monotonic(), 0.1)
+            error = response = None
+            try:
+                response = self.__send(url, timeout=clip_timeout(timeout, remaining),
+                                       **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as err:
+                error = err
+            except BaseException:
+                breaker.release()
+                raise
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                breaker.record_success()
+                return response
+            breaker.record_failure()
+            delay = get_backoff(attempt, response)
+            if attempt >= retries or time.monotonic() + delay >= end:
+                if response is not None:
+                    return response
+                raise error
+            logger.debug("Retrying %s in %.2fs after: %s", url, delay,
+                         error or response.status_code)
+            if response is not None:
+                response.close()
+            if xbmc.Monitor().waitForAbort(delay):
+                # Kodi is exiting
+                raise error or requests.HTTPError(response=response)
+            attempt += 1
+
+    def __send(self, url, **kwargs):
+        with self.__lock:
+            self.request_count += 1
+        start = time.monotonic()
+        response = self.session.get(url, **kwargs)
+        if self.throughput is not None and not kwargs.get('stream'):
+            # The body has been read already. Time until the headers arrived is
+            # the round trip & the server's work, not transfer, so it is left out.
+            transfer = time.monotonic() - start - response.elapsed.total_seconds()
+            self.throughput.add_sample(len(response.content), transfer)
+        return response
+
+    def __get_breaker(self, host):
+        with self.__lock:
+            breaker = self.breakers.get(host)
+            if breaker is None:
+                breaker = self.breakers[host] = CircuitBreaker()
+            return breaker
+
+    def get_stats(self):
+        """
+        Get connection reuse statistics for this transport, since the last call
+        to reset_stats()
+        :return: A dict of request, connection & reused connection counts
+        """
+        request_count = self.request_count - self.__baseline[0]
+        connections = self.__count_connections() - self.__baseline[1]
+        return {
+            'requests': request_count,
+            'connections': connections,
+            'reused': max(request_count - connections, 0),
+        }
+
+    def reset_stats(self):
+        """
+        Start counting statistics afresh, e.g., for a new plugin invocation
+        :return: None
+        """
+        self.__baseline = (self.request_count, self.__count_connections())
+
+    def __count_connections(self):
+        connections = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                connections += pools[key].num_connections
+        return connections
+
+    def close(self):
+        self.session.close()
+
+
+def clip_timeout(timeout, remaining):
+    """
+    Shorten request timeouts so they end by a deadline
+    :param timeout: A timeout in seconds, or a (connect, read) tuple of them
+    :param remaining: Seconds until the deadline
+    :return: The clipped timeout
+    """
+    if timeout is None:
+        return remaining
+    if isinstance(timeout, tuple):
+        return tuple(min(part, remaining) for part in timeout)
+    return min(timeout, remaining)
+
+
+def get_backoff(attempt, response=None):
+    """
+    Get the delay before retrying a request
+    :param attempt: The number of the failed attempt, from 0
+    :param response: The failed response, if any
+    :return: The delay in seconds
+    """
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    if response is not None:
+        # The server may say when to come back
+        try:
+            delay = max(delay, float(response.headers.get('Retry-After', 0)))
+        except ValueError:
+            pass
+    return delay
+
+
+def get_transport():
+    """
+    Get the transport shared by all server requests in this invocation
+    :return: The Transport instance
+    """
+    global _transport
+    if _transport is None:
+        _transport = Transport(throughput=get_throughput())
+    return _transport
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+
+#  Copyright (c) 2024
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from resources.lib import kodilogging
+from resources.lib import kodiservice
+
+# Keep this file to a minimum, as Kodi
+# doesn't keep a compiled copy of this
+kodilogging.config()
+
+kodiservice.run()
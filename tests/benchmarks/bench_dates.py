@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of Event date parsing: parse_date() against dateutil, over the
+dates of a sample 500-Event page.
+
+    python tests/benchmarks/bench_dates.py [--rounds N]
+"""
+
+import argparse
+import time
+
+from fixtures import load_events, use_repo
+
+
+def time_parser(parse, dates, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for date in dates:
+            parse(date)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=10,
+                        help="passes over the sample Events (default: 10)")
+    args = parser.parse_args()
+
+    use_repo()
+    from resources.lib.model.event import Event, parse_date
+    from resources.lib.model.identity_map import IDENTITY_MAP
+
+    events = load_events()
+    dates = [event['date'] for event in events]
+    count = len(dates) * args.rounds
+    print(f"{count} parses ({len(dates)} dates x {args.rounds})")
+
+    fast = time_parser(parse_date, dates, args.rounds)
+    print(f"parse_date:          {fast * 1000:8.1f} ms  {fast / count * 1e6:6.2f} us/date")
+    try:
+        import dateutil.parser
+    except ImportError:
+        print("dateutil:            not installed")
+    else:
+        slow = time_parser(dateutil.parser.parse, dates, args.rounds)
+        print(f"dateutil:            {slow * 1000:8.1f} ms  {slow / count * 1e6:6.2f} us/date"
+              f"  ({slow / fast:.0f}x slower)")
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        IDENTITY_MAP.clear()
+        for event in events:
+            Event.create_event(event)
+    page = (time.perf_counter() - start) / args.rounds
+    print(f"Event.create_event:  {page * 1000:8.1f} ms  per {len(events)}-Event page")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: bytes allocated per Event when building the models of a
+sample 500-Event page. The JSON is decoded before measuring, so only the
+model objects count.
+
+To compare with an earlier version, check it out elsewhere and point --repo
+at it, e.g.:
+
+    git worktree add /tmp/before <commit>
+    python tests/benchmarks/bench_memory.py --repo /tmp/before
+    python tests/benchmarks/bench_memory.py
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from fixtures import load_events, use_repo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repo', help="checkout to import the addon from "
+                                       "(default: this one)")
+    args = parser.parse_args()
+
+    use_repo(args.repo)
+    from resources.lib.model.event import Event
+
+    events = load_events()
+    gc.collect()
+    tracemalloc.start()
+    models = [Event.create_event(event) for event in events]
+    gc.collect()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{len(models)} Events: {size / 1024:.1f} KiB retained, "
+          f"{peak / 1024:.1f} KiB peak")
+    print(f"{size / len(models):.0f} bytes per Event")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: how long each route spends importing modules, not
+counting those Python itself imports at startup. Every route
+is invoked in a fresh interpreter, as Kodi does without reuselanguageinvoker,
+with the Kodi modules stubbed (tests/stubs) and -X importtime on. The server
+address points at a closed port, so routes which fetch data fail fast and only
+their imports are measured.
+
+    python tests/benchmarks/bench_startup.py [--rounds N] [--repo PATH]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from fixtures import REPO_DIR
+
+STUBS_DIR = os.path.join(REPO_DIR, 'tests', 'stubs')
+BASE_URL = 'plugin://plugin.matchday'
+VIDEO_URL = 'http%3A%2F%2F127.0.0.1%3A9%2Fapi%2Fv1%2Fvideo-sources%2F1'
+ROUTES = [
+    '/',
+    '/events',
+    '/competitions',
+    '/teams',
+    '/competitions/1/teams',
+    '/competitions/details/1',
+    '/play/' + VIDEO_URL,
+    '/video/select_video_source/' + VIDEO_URL,
+]
+# Nothing listens here
+SERVER_ADDRESS = 'http://127.0.0.1:9'
+
+
+def parse_import_times(output):
+    """
+    :param output: The stderr of a run with -X importtime
+    :return: A dict of top-level module name to cumulative import time in µs
+    """
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the module which imported them
+        if not name.startswith('  '):
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def time_route(route, repo, profile):
+    """
+    Invoke a route in a new interpreter
+    :param route: The route's path
+    :param repo: The checkout to run
+    :param profile: The addon profile folder
+    :return: A tuple of wall time in seconds and the import times
+    """
+    env = dict(os.environ,
+               PYTHONPATH=os.pathsep.join(filter(None, [STUBS_DIR, repo,
+                                                        os.environ.get('PYTHONPATH')])),
+               KODI_SETTINGS=json.dumps({'matchday-server-address': SERVER_ADDRESS}),
+               KODI_PROFILE=profile)
+    # Kodi passes the plugin URL, handle and query string as sys.argv
+    code = ("import sys; sys.argv = {!r}; "
+            "exec(compile(open('main.py').read(), 'main.py', 'exec'), "
+            "{{'__name__': '__main__'}})").format([BASE_URL + route, '1', ''])
+    argv = [sys.executable, '-X', 'importtime', '-c', code]
+    start = time.perf_counter()
+    result = subprocess.run(argv, cwd=repo, env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True, check=False)
+    return time.perf_counter() - start, parse_import_times(result.stderr)
+
+
+def get_interpreter_imports():
+    """
+    :return: The names of the modules Python imports before running any code
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'pass'],
+                            stderr=subprocess.PIPE, text=True, check=True)
+    return set(parse_import_times(result.stderr))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=5,
+                        help="invocations per route (default: %(default)s)")
+    parser.add_argument('--top', type=int, default=5,
+                        help="slowest imports to list per route (default: %(default)s)")
+    parser.add_argument('--repo', default=REPO_DIR,
+                        help="checkout to run (default: this one)")
+    args = parser.parse_args()
+
+    interpreter = get_interpreter_imports()
+    with tempfile.TemporaryDirectory() as profile:
+        for route in ROUTES:
+            walls, totals, modules = [], [], {}
+            for _ in range(args.rounds):
+                wall, times = time_route(route, args.repo, profile)
+                times = {name: cumulative for name, cumulative in times.items()
+                         if name not in interpreter}
+                walls.append(wall)
+                totals.append(sum(times.values()))
+                for name, cumulative in times.items():
+                    modules.setdefault(name, []).append(cumulative)
+            slowest = sorted(((statistics.median(values), name)
+                              for name, values in modules.items()), reverse=True)
+            print(f"{route[:50]}: imports {statistics.median(totals) / 1000:.1f} ms, "
+                  f"total {statistics.median(walls) * 1000:.0f} ms")
+            for cumulative, name in slowest[:args.top]:
+                print(f"    {cumulative / 1000:7.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
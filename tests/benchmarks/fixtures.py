@@ -0,0 +1,30 @@
+"""
+Loading of sample server payloads for the benchmarks.
+"""
+
+import gzip
+import json
+import os
+import sys
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'fixtures')
+REPO_DIR = os.path.dirname(os.path.dirname(FIXTURES_DIR))
+
+
+def use_repo(path=None):
+    """
+    Import the addon's modules from a checkout, by default this one
+    :param path: The root of the checkout
+    :return: None
+    """
+    sys.path.insert(0, path or REPO_DIR)
+
+
+def load_events(name='events.json.gz'):
+    """
+    :param name: The fixture file; a page of Events in the server's HAL format
+    :return: The list of Event JSON data
+    """
+    with gzip.open(os.path.join(FIXTURES_DIR, name), 'rt', encoding='utf-8') as data:
+        return json.load(data)['_embedded']['matches']
@@ -0,0 +1,10 @@
+"""
+Makes the addon and the Kodi stubs importable by the tests.
+"""
+
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+sys.path[:0] = [os.path.join(TESTS_DIR, 'stubs'), os.path.dirname(TESTS_DIR)]
@@ -0,0 +1,49 @@
+"""
+Stub of the script.module.routing addon module: enough of Plugin to register
+routes, build their URLs and dispatch an invocation.
+"""
+
+import re
+import sys
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+BASE_URL = 'plugin://plugin.matchday'
+
+
+class Plugin:
+
+    def __init__(self, base_url=None):
+        self.base_url = base_url or BASE_URL
+        self.handle = -1
+        self.args = {}
+        self.rules = []
+
+    def route(self, pattern):
+        def decorator(func):
+            regex = re.sub(r'<(path:)?(\w+)>',
+                           lambda m: '(?P<{}>{})'.format(m[2], '.+' if m[1] else '[^/]+'),
+                           pattern)
+            self.rules.append((pattern, re.compile('^' + regex + '$'), func))
+            return func
+        return decorator
+
+    def url_for(self, func, *args, **kwargs):
+        for pattern, _, view in self.rules:
+            if view is func:
+                path = pattern
+                for arg in args:
+                    path = re.sub(r'<[^>]+>', str(arg), path, count=1)
+                query = '?' + urlencode(kwargs) if kwargs else ''
+                return self.base_url + path + query
+        raise KeyError(func)
+
+    def run(self, argv=None):
+        argv = argv or sys.argv
+        self.handle = int(argv[1]) if len(argv) > 1 else -1
+        self.args = parse_qs(argv[2].lstrip('?')) if len(argv) > 2 else {}
+        path = urlsplit(argv[0]).path or '/'
+        for _, regex, view in self.rules:
+            match = regex.match(path)
+            if match:
+                return view(**match.groupdict())
+        raise KeyError(path)
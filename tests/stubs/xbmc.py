@@ -0,0 +1,59 @@
+"""
+Stub of Kodi's xbmc module.
+"""
+
+import time
+
+LOGDEBUG, LOGINFO, LOGWARNING, LOGERROR, LOGFATAL, LOGNONE = range(6)
+PLAYLIST_VIDEO = 1
+
+# Calls made by the addon, for inspection
+LOG = []
+BUILTINS = []
+
+
+def log(msg, level=LOGDEBUG):
+    LOG.append((level, msg))
+
+
+def executebuiltin(function, wait=False):
+    BUILTINS.append(function)
+
+
+def executeJSONRPC(jsonrpccommand):
+    return '{}'
+
+
+def getInfoLabel(label):
+    return ''
+
+
+class PlayList:
+
+    def __init__(self, playlist):
+        self.items = []
+
+    def add(self, url, listitem=None, index=-1):
+        self.items.append(url)
+
+    def clear(self):
+        self.items = []
+
+
+class Player:
+
+    def isPlaying(self):
+        return False
+
+    def isPlayingVideo(self):
+        return False
+
+
+class Monitor:
+
+    def abortRequested(self):
+        return False
+
+    def waitForAbort(self, timeout=0):
+        time.sleep(timeout or 0)
+        return False
@@ -0,0 +1,42 @@
+"""
+Stub of Kodi's xbmcaddon module.
+"""
+
+import json
+import os
+import tempfile
+
+ADDON_PATH = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Addon:
+
+    def __init__(self, id=None):
+        self.settings = json.loads(os.environ.get('KODI_SETTINGS', '{}'))
+
+    def getSetting(self, id):
+        return str(self.settings.get(id, ''))
+
+    def setSetting(self, id, value):
+        self.settings[id] = value
+
+    def getSettingBool(self, id):
+        return self.getSetting(id).lower() == 'true'
+
+    def getSettingInt(self, id):
+        return int(self.getSetting(id) or 0)
+
+    def getAddonInfo(self, id):
+        return {
+            'id': 'plugin.matchday',
+            'path': ADDON_PATH,
+            'profile': os.environ.get('KODI_PROFILE',
+                                      os.path.join(tempfile.gettempdir(), 'matchday-profile')),
+            'icon': '',
+        }.get(id, '')
+
+    def getLocalizedString(self, id):
+        return str(id)
+
+    def openSettings(self):
+        pass
@@ -0,0 +1,35 @@
+"""
+Stub of Kodi's xbmcgui module.
+"""
+
+
+class InfoTagVideo:
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class ListItem:
+
+    def __init__(self, label='', label2='', path='', offscreen=False):
+        self.label = label
+        self.path = path
+        self.properties = {}
+
+    def setProperty(self, key, value):
+        self.properties[key] = value
+
+    def getVideoInfoTag(self):
+        return InfoTagVideo()
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class Dialog:
+
+    def notification(self, heading, message, icon='', time=0, sound=True):
+        pass
+
+    def select(self, heading, list, *args, **kwargs):
+        return -1
@@ -0,0 +1,35 @@
+"""
+Stub of Kodi's xbmcplugin module.
+"""
+
+SORT_METHOD_LABEL_IGNORE_THE = 2
+
+# Directory items and resolved URLs, for inspection
+ITEMS = []
+RESOLVED = []
+
+
+def addDirectoryItem(handle, url, listitem, isFolder=False, totalItems=0):
+    ITEMS.append((url, listitem, isFolder))
+    return True
+
+
+def addDirectoryItems(handle, items, totalItems=0):
+    ITEMS.extend(items)
+    return True
+
+
+def endOfDirectory(handle, succeeded=True, updateListing=False, cacheToDisc=True):
+    pass
+
+
+def setResolvedUrl(handle, succeeded, listitem):
+    RESOLVED.append((succeeded, listitem))
+
+
+def setContent(handle, content):
+    pass
+
+
+def addSortMethod(handle, sortMethod, labelMask='', label2Mask=''):
+    pass
@@ -0,0 +1,71 @@
+"""
+Tests for pruning the response cache.
+"""
+
+import os
+import time
+
+from resources.lib.cache import STALE_LOCK, STALE_TMP, ResponseCache
+
+DAY = 24 * 60 * 60
+
+
+def make_cache(tmp_path, *entries):
+    cache = ResponseCache(str(tmp_path))
+    for url, age, size in entries:
+        cache.put(url, 'x' * size)
+        for path in get_files(cache, url):
+            os.utime(path, (time.time() - age,) * 2)
+    return cache
+
+
+def get_files(cache, url):
+    body_path = cache.get(url).body_path
+    return [body_path, body_path[:-len('.body')] + '.json']
+
+
+def test_removes_old_entries(tmp_path):
+    cache = make_cache(tmp_path, ('http://server/old', 3 * DAY, 10),
+                       ('http://server/new', 60, 10))
+    assert cache.prune(2 * DAY) == 1
+    assert cache.get('http://server/old') is None
+    assert cache.get('http://server/new') is not None
+
+
+def test_removes_oldest_entries_over_size(tmp_path):
+    cache = make_cache(tmp_path, ('http://server/a', 300, 1000),
+                       ('http://server/b', 200, 1000),
+                       ('http://server/c', 100, 1000))
+    cache.prune(DAY, max_size=2500)
+    assert cache.get('http://server/a') is None
+    assert cache.get('http://server/b') is not None
+    assert cache.get('http://server/c') is not None
+
+
+def test_revalidated_entries_are_kept(tmp_path):
+    cache = make_cache(tmp_path, ('http://server/a', 3 * DAY, 10))
+    cache.touch(cache.get('http://server/a'))
+    assert cache.prune(2 * DAY) == 0
+    assert cache.get('http://server/a') is not None
+
+
+def test_removes_left_over_files(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    old_lock = tmp_path / 'a.lock'
+    new_lock = tmp_path / 'b.lock'
+    old_tmp = tmp_path / 'c.body.1.2.tmp'
+    lone_body = tmp_path / 'd.body'
+    for path in (old_lock, new_lock, old_tmp, lone_body):
+        path.write_text('')
+    os.utime(old_lock, (time.time() - STALE_LOCK - 1,) * 2)
+    os.utime(old_tmp, (time.time() - STALE_TMP - 1,) * 2)
+    os.utime(lone_body, (time.time() - STALE_TMP - 1,) * 2)
+    cache.prune(DAY)
+    assert sorted(os.listdir(tmp_path)) == ['b.lock']
+
+
+def test_entry_being_written_is_kept(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    (tmp_path / 'a.body').write_text('{}')
+    cache.prune(DAY)
+    assert os.listdir(tmp_path) == ['a.body']
@@ -0,0 +1,80 @@
+"""
+Tests for the incremental decoding of a JSON array.
+"""
+
+import json
+
+import pytest
+
+from resources.lib.jsonstream import JsonArrayStream
+
+PAGE = {
+    '_embedded': {
+        'matches': [
+            {'eventId': 'e1', 'title': 'Home v Away [replay], part 1'},
+            {'eventId': 'e2', 'title': 'Brackets ] and commas , in "quotes"'},
+            {'eventId': 'e3', 'nested': [[1, 2], {'a': ']'}]},
+        ]
+    },
+    '_links': {'next': {'href': 'http://server/events?page=1'}},
+}
+
+
+def split(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def read(chunks, key='matches'):
+    stream = JsonArrayStream(chunks, key)
+    return list(stream), stream.envelope
+
+
+def get_envelope(page):
+    envelope = json.loads(json.dumps(page))
+    envelope['_embedded']['matches'] = []
+    return envelope
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 16, 1000])
+def test_items_across_chunk_boundaries(size):
+    items, envelope = read(split(json.dumps(PAGE), size))
+    assert items == PAGE['_embedded']['matches']
+    assert envelope == get_envelope(PAGE)
+
+
+def test_strings_with_brackets_and_commas():
+    items, _ = read([json.dumps(PAGE)])
+    assert items[0]['title'] == 'Home v Away [replay], part 1'
+    assert items[1]['title'] == 'Brackets ] and commas , in "quotes"'
+    assert items[2]['nested'] == [[1, 2], {'a': ']'}]
+
+
+def test_whitespace_between_items():
+    text = '{"matches" : [\n  {"id": 1} ,\n\t{"id": 2}\n ] , "size": 2}'
+    items, envelope = read(split(text, 4))
+    assert items == [{'id': 1}, {'id': 2}]
+    assert envelope == {'matches': [], 'size': 2}
+
+
+def test_empty_array():
+    items, envelope = read(split('{"_embedded": {"matches": []}, "page": 0}', 5))
+    assert items == []
+    assert envelope == {'_embedded': {'matches': []}, 'page': 0}
+
+
+def test_missing_key():
+    page = {'_links': {'self': {'href': 'http://server/events?page=9'}}, 'page': 9}
+    items, envelope = read(split(json.dumps(page), 4))
+    assert items == []
+    assert envelope == page
+
+
+def test_truncated_document():
+    text = json.dumps(PAGE)
+    with pytest.raises(ValueError):
+        read(split(text[:len(text) // 2], 10))
+
+
+def test_envelope_before_items_are_read():
+    stream = JsonArrayStream([json.dumps(PAGE)], 'matches')
+    assert stream.envelope is None
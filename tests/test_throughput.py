@@ -0,0 +1,48 @@
+"""
+Tests for the throughput estimate and how often it is saved.
+"""
+
+import json
+
+from resources.lib import throughput
+from resources.lib.throughput import MIN_SAMPLE_BYTES, SAVE_INTERVAL, \
+    ThroughputEstimate
+
+# One second for MIN_SAMPLE_BYTES at 8 Mbps
+MBPS = MIN_SAMPLE_BYTES * 8 / 1000000
+
+
+def read_mbps(path):
+    with open(path, 'r', encoding='utf-8') as data_file:
+        return json.load(data_file)['mbps']
+
+
+def test_small_samples_are_ignored(tmp_path):
+    estimate = ThroughputEstimate(str(tmp_path / 'throughput.json'))
+    estimate.add_sample(MIN_SAMPLE_BYTES - 1, 1)
+    estimate.add_sample(MIN_SAMPLE_BYTES, 0)
+    assert estimate.get_mbps() is None
+
+
+def test_saved_at_most_every_interval(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(throughput.time, 'monotonic', lambda: now[0])
+    path = tmp_path / 'throughput.json'
+    estimate = ThroughputEstimate(str(path))
+    estimate.add_sample(MIN_SAMPLE_BYTES, 1)
+    assert not path.exists()
+    now[0] += SAVE_INTERVAL
+    estimate.add_sample(MIN_SAMPLE_BYTES, 1)
+    assert read_mbps(path) == estimate.get_mbps()
+    estimate.add_sample(MIN_SAMPLE_BYTES, 2)
+    assert read_mbps(path) == MBPS
+    estimate.save()
+    assert read_mbps(path) == estimate.get_mbps() < MBPS
+
+
+def test_loads_saved_estimate(tmp_path):
+    path = str(tmp_path / 'throughput.json')
+    estimate = ThroughputEstimate(path)
+    estimate.add_sample(MIN_SAMPLE_BYTES, 1)
+    estimate.save()
+    assert ThroughputEstimate(path).get_mbps() == estimate.get_mbps()
@@ -0,0 +1,232 @@
+"""
+Tests for retries, backoff & the circuit breaker of the HTTP transport.
+"""
+
+from datetime import timedelta
+
+import pytest
+
+requests = pytest.importorskip('requests')
+
+import xbmc  # noqa: E402
+from resources.lib import transport  # noqa: E402
+from resources.lib.transport import BACKOFF_BASE, BACKOFF_CAP, CircuitBreaker, \
+    CircuitOpenError, Transport, clip_timeout, get_backoff  # noqa: E402
+
+URL = 'http://server/api/events'
+
+
+class Clock:
+    """
+    Stands in for time.monotonic(); only moves when the transport waits
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(transport.time, 'monotonic', clock.monotonic)
+    return clock
+
+
+@pytest.fixture
+def waits(monkeypatch, clock):
+    waits = []
+
+    def wait_for_abort(_, timeout=0):
+        waits.append(timeout)
+        clock.now += timeout
+        return False
+
+    monkeypatch.setattr(xbmc.Monitor, 'waitForAbort', wait_for_abort)
+    return waits
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    # Always the longest backoff
+    monkeypatch.setattr(transport.random, 'uniform', lambda low, high: high)
+
+
+def make_response(status=200, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = b'{}'
+    response._content_consumed = True
+    response.elapsed = timedelta(0)
+    return response
+
+
+def make_transport(*outcomes):
+    """
+    :param outcomes: What each request returns (a status code) or raises
+    :return: A Transport whose session plays the outcomes, recording calls
+    """
+    client = Transport()
+    client.calls = []
+    outcomes = list(outcomes)
+
+    def get(url, **kwargs):
+        client.calls.append(kwargs)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return make_response(*outcome) if isinstance(outcome, tuple) else make_response(outcome)
+
+    client.session.get = get
+    return client
+
+
+def test_retries_connection_errors(waits):
+    client = make_transport(requests.ConnectionError(), requests.Timeout(), 200)
+    assert client.get(URL).status_code == 200
+    assert len(client.calls) == 3
+    assert len(waits) == 2
+
+
+def test_retries_server_errors(waits):
+    client = make_transport(503, 502, 200)
+    assert client.get(URL).status_code == 200
+    assert len(client.calls) == 3
+
+
+def test_other_errors_are_not_retried(waits):
+    client = make_transport(404)
+    assert client.get(URL).status_code == 404
+    assert len(client.calls) == 1
+    assert waits == []
+
+
+def test_gives_up_after_retries(waits):
+    client = make_transport(503, 503, 503)
+    assert client.get(URL, retries=2).status_code == 503
+    assert len(client.calls) == 3
+    error = requests.ConnectionError()
+    client = make_transport(requests.ConnectionError(), error)
+    with pytest.raises(requests.ConnectionError) as raised:
+        client.get(URL, retries=1)
+    assert raised.value is error
+
+
+def test_backoff_grows_exponentially(waits, no_jitter):
+    client = make_transport(*[503] * 6)
+    client.breakers['server'] = CircuitBreaker(threshold=10)
+    client.get(URL, retries=5, deadline=100)
+    assert waits == [min(BACKOFF_BASE * 2 ** attempt, BACKOFF_CAP)
+                     for attempt in range(5)]
+
+
+def test_backoff_is_jittered():
+    for attempt in range(10):
+        delay = get_backoff(attempt)
+        assert 0 <= delay <= min(BACKOFF_BASE * 2 ** attempt, BACKOFF_CAP)
+
+
+def test_retry_after():
+    assert get_backoff(0, make_response(503, {'Retry-After': '3'})) >= 3
+    # HTTP dates aren't supported; the usual backoff applies
+    delay = get_backoff(0, make_response(503, {'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}))
+    assert delay <= BACKOFF_BASE
+
+
+def test_retry_after_is_waited_for(waits):
+    client = make_transport((429, {'Retry-After': '2'}), 200)
+    assert client.get(URL).status_code == 200
+    assert waits[0] >= 2
+
+
+def test_no_retry_past_deadline(waits):
+    client = make_transport((503, {'Retry-After': '30'}), 200)
+    assert client.get(URL, deadline=10).status_code == 503
+    assert waits == []
+
+
+def test_timeouts_are_clipped_to_deadline(clock, waits, no_jitter):
+    client = make_transport(503, 200)
+    client.get(URL, deadline=5, timeout=(5, 30))
+    assert client.calls[0]['timeout'] == (5, 5)
+    # The first backoff took BACKOFF_BASE seconds
+    assert client.calls[1]['timeout'] == (5 - BACKOFF_BASE, 5 - BACKOFF_BASE)
+
+
+def test_clip_timeout():
+    assert clip_timeout(None, 4) == 4
+    assert clip_timeout(10, 4) == 4
+    assert clip_timeout(2, 4) == 2
+    assert clip_timeout((5, 30), 8) == (5, 8)
+
+
+def test_breaker_opens_after_failures(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=30)
+    for _ in range(2):
+        breaker.record_failure()
+        assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+
+def test_breaker_success_resets_failures(clock):
+    breaker = CircuitBreaker(threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.allow()
+
+
+def test_breaker_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    # Others wait for the trial's outcome
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.allow()
+    assert breaker.allow()
+
+
+def test_breaker_failed_trial_reopens(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_breaker_release_frees_trial(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_open_circuit_fails_without_request(waits):
+    client = make_transport(requests.ConnectionError(), requests.ConnectionError())
+    client.breakers['server'] = CircuitBreaker(threshold=2)
+    with pytest.raises(CircuitOpenError):
+        client.get(URL, retries=5, deadline=100)
+    assert len(client.calls) == 2
+
+
+def test_unexpected_error_releases_trial(clock, waits):
+    client = make_transport(requests.exceptions.InvalidURL(), 200)
+    breaker = client.breakers['server'] = CircuitBreaker(threshold=1, cooldown=30)
+    breaker.record_failure()
+    clock.now += 30
+    with pytest.raises(requests.exceptions.InvalidURL):
+        client.get(URL)
+    assert client.get(URL).status_code == 200
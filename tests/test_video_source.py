@@ -0,0 +1,100 @@
+"""
+Tests for reading video source attributes & choosing a variant to play.
+"""
+
+import pytest
+
+from resources.lib.model.video_source import parse_bitrate, parse_codec, \
+    parse_resolution
+
+
+@pytest.mark.parametrize('resolution, height', [
+    ('1080p', 1080),
+    ('1920x1080', 1080),
+    ('1280 x 720', 720),
+    ('4K', 2160),
+    ('hd', 720),
+    (720, 720),
+    ('', 0),
+])
+def test_parse_resolution(resolution, height):
+    assert parse_resolution(resolution) == height
+
+
+@pytest.mark.parametrize('bitrate, mbps', [
+    ('8 Mbps', 8),
+    ('8000kbps', 8),
+    ('2.5M', 2.5),
+    (8, 8),
+    ('', 0),
+])
+def test_parse_bitrate(bitrate, mbps):
+    assert parse_bitrate(bitrate) == pytest.approx(mbps)
+
+
+@pytest.mark.parametrize('codec, name', [
+    ('avc1.640028', 'h264'),
+    ('H.264', 'h264'),
+    ('AVC', 'h264'),
+    ('hvc1.1.6.L93.B0', 'h265'),
+    ('H.265', 'h265'),
+    ('vp9', 'vp9'),
+    ('', ''),
+])
+def test_parse_codec(codec, name):
+    assert parse_codec(codec) == name
+
+
+def make_list(*variants):
+    """
+    :param variants: The (resolution, bitrate, codec, languages) of each variant
+    :return: A VideoSourceList of the variants
+    """
+    pytest.importorskip('requests')
+    from resources.lib.model.videosourcelist import VideoSourceList
+    return VideoSourceList({
+        '_links': {'preferred': {'href': 'http://server/preferred'}},
+        '_embedded': {'video-sources': [{
+            'resolution': resolution,
+            'videoBitrate': bitrate,
+            'videoCodec': codec,
+            'languages': languages,
+            '_links': {'stream': {'href': f'http://server/{resolution}/{codec}'}},
+        } for resolution, bitrate, codec, languages in variants]},
+    })
+
+
+VARIANTS = [
+    ('2160p', '20 Mbps', 'hvc1.2.4.L153', 'English'),
+    ('1080p', '8 Mbps', 'avc1.640028', 'English'),
+    ('720p', '4 Mbps', 'avc1.4d401f', 'English'),
+    ('720p', '3 Mbps', 'avc1.4d401f', 'Spanish'),
+]
+
+
+@pytest.mark.parametrize('bandwidth, language, codec, chosen', [
+    # The best variant which fits 80% of the bandwidth
+    (30, '', '', ('2160p', 'h265')),
+    (10, '', '', ('1080p', 'h264')),
+    # 8 Mbps would use all of 9 Mbps, leaving no headroom
+    (9, '', '', ('720p', 'h264')),
+    # Nothing fits; the least demanding variant
+    (2, '', '', ('720p', 'h264')),
+    (30, '', 'h264', ('1080p', 'h264')),
+    (30, 'spanish', '', ('720p', 'h264')),
+    # No variant matches; the preference is ignored
+    (30, 'French', 'vp9', ('2160p', 'h265')),
+])
+def test_choose_variant(bandwidth, language, codec, chosen):
+    variant = make_list(*VARIANTS).choose_variant(bandwidth, language, codec)
+    assert (variant.resolution, variant.codec) == chosen
+
+
+def test_fallback_keeps_preferences():
+    # Nothing fits; the least demanding variant in the preferred language
+    variant = make_list(*VARIANTS).choose_variant(2, 'Spanish')
+    assert variant.bitrate_mbps == 3
+
+
+def test_choose_variant_without_variants():
+    assert make_list().choose_variant(10) is None